@@ -0,0 +1,14 @@
+from ansible_collections.dstanek.software.plugins.module_utils.resolvers import (
+    GenericResolver,
+)
+from ansible_collections.dstanek.software.plugins.modules.generic_release import (
+    MODULE_SPEC,
+)
+from ansible_collections.dstanek.software.plugins.plugin_utils.staging import (
+    StagingAction,
+)
+
+
+class ActionModule(StagingAction):
+    module_spec = MODULE_SPEC
+    resolver_class = GenericResolver
@@ -0,0 +1,26 @@
+from ansible_collections.dstanek.software.plugins.module_utils.github_api import (
+    GithubApiResolver,
+)
+from ansible_collections.dstanek.software.plugins.module_utils.resolvers import (
+    GITHUB_ARGS_DEFAULT, GithubVersionResolver,
+)
+from ansible_collections.dstanek.software.plugins.modules.github_release import (
+    MODULE_SPEC,
+)
+from ansible_collections.dstanek.software.plugins.plugin_utils.staging import (
+    StagingAction,
+)
+
+
+class ActionModule(StagingAction):
+    module_spec = MODULE_SPEC
+    resolver_class = GithubVersionResolver
+
+    def prepare_params(self, params):
+        for key in ("version_url_template", "download_url_template"):
+            params[key] = params[key] or GITHUB_ARGS_DEFAULT[key]
+
+    def make_resolver(self, module):
+        if module.params["github_api"]:
+            return GithubApiResolver(module)
+        return super().make_resolver(module)
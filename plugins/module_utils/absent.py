@@ -1,8 +1,11 @@
 from .common import Software, create_versioned_path
 from .errors import SoftwareException
+from .manifest import Manifest
+from .versioned_path import VersionedPath
+from . import validators
 
 
-def run(params):
+def run(params, check_mode=False):
     software = Software.from_param(params.pop("name"))
     if software.version:
         raise SoftwareException(
@@ -11,19 +14,29 @@ def run(params):
             version=software.version,
         )
 
-    dest = create_versioned_path(params.pop("dest"), software.name)
-    if dest.exists():
-        dest.remove()
-        versioned_path = str(dest.target) if dest.target else None
-        return True, {
-            "path": str(dest),
-            "versioned_path": versioned_path,
-            "state": "absent",
-        }
-
+    dest_dir = params.pop("dest")
+    dest = create_versioned_path(dest_dir, software.name)
     versioned_path = str(dest.target) if dest.target else None
-    return False, {
-        "path": str(dest),
-        "versioned_path": versioned_path,
-        "state": "absent",
-    }
+
+    # The manifest knows every link a release owns, such as each file taken
+    # from a tarball. Without an entry only the link named after it is removed.
+    installed = Manifest(dest.path.parent)
+    entry = installed.get(software.name)
+    if entry:
+        owned = [VersionedPath(installed.directory / link) for link in entry["files"]]
+    else:
+        owned = [dest]
+    owned = [vp for vp in owned if vp.exists() and vp.managed()]
+
+    result = {"path": str(dest), "versioned_path": versioned_path, "state": "absent"}
+    if entry:
+        result["files"] = [str(vp) for vp in owned]
+    changed = bool(owned or entry)
+    if check_mode:
+        return changed, result
+
+    validators.store_path(dest.path.parent, software.name).unlink(missing_ok=True)
+    for vp in owned:
+        vp.remove()
+    installed.forget(software.name)
+    return changed, result
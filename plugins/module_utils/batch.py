@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from ansible.module_utils.basic import AnsibleModule
+
+from . import absent
+from . import github_api
+from . import latest
+from . import present
+from . import retry
+from .common import Software, SoftwareRequest
+from .errors import SoftwareException
+from .resolvers import GITHUB_ARGS_DEFAULT, GenericResolver, GithubVersionResolver
+
+# Options of an item that resolve its versions, which is all that
+# software_outdated needs
+RESOLVE_SPEC = dict(
+    name=dict(required=True, type="str"),
+    source=dict(type="str", choices=["generic", "github"]),
+    dest=dict(type="path"),
+    tarball_args=dict(type="dict", default={}),
+    github_args=dict(type="dict"),
+    os_platform=dict(type="str", default="linux"),
+    version_url_template=dict(type="str"),
+    download_url_template=dict(type="str"),
+    github_host=dict(type="str", default="github.com"),
+    github_project=dict(type="str"),
+    cache_dir=dict(type="path"),
+    version_cache_ttl=dict(type="int"),
+    conditional_requests=dict(type="bool"),
+    retry=dict(type="dict", options=retry.RETRY_SPEC),
+    mirrors=dict(type="list", elements="str"),
+    github_api=dict(type="bool"),
+    github_api_url=dict(type="str"),
+    github_token=dict(type="str", no_log=True),
+)
+
+# The options an item inherits from the module when it does not set them
+RESOLVE_SHARED_OPTIONS = (
+    "dest",
+    "cache_dir",
+    "version_cache_ttl",
+    "conditional_requests",
+    "retry",
+    "mirrors",
+    "github_api",
+    "github_api_url",
+    "github_token",
+)
+
+# Options of an item of releases, which also installs it
+RELEASE_SPEC = dict(
+    RESOLVE_SPEC,
+    mode=dict(type="raw"),
+    owner=dict(type="str"),
+    group=dict(type="str"),
+    release_type=dict(
+        type="str",
+        choices=["executable", "compressed_executable", "tarball", "zip"],
+        default="executable",
+    ),
+    state=dict(
+        type="str",
+        choices=["absent", "present", "latest"],
+    ),
+    cache_max_size=dict(type="int"),
+    download_attempts=dict(type="int"),
+    download_chunks=dict(type="int"),
+    checksum=dict(type="str"),
+    keep_versions=dict(type="int"),
+    dedupe=dict(type="str", choices=["none", "hardlink", "reflink"]),
+)
+
+RELEASE_SHARED_OPTIONS = RESOLVE_SHARED_OPTIONS + (
+    "mode",
+    "owner",
+    "group",
+    "state",
+    "cache_max_size",
+    "download_attempts",
+    "download_chunks",
+    "keep_versions",
+    "dedupe",
+)
+
+
+class ItemModule:
+    """Presents one release of a batch as if it were its own module.
+
+    Everything except ``params`` is delegated to the real module so helpers
+    like ``fetch_url`` and ``load_file_common_arguments`` keep working.
+    """
+
+    def __init__(self, module: AnsibleModule, params: Dict[str, Any]) -> None:
+        self._module = module
+        self.params = params
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+def build_item(
+    module: AnsibleModule,
+    item_params: Dict[str, Any],
+    shared_options: Tuple[str, ...],
+    required: str,
+):
+    """Create the module and resolver one item of a batch runs with.
+
+    ``shared_options`` are taken from ``module`` where the item does not set
+    them. Generic items must set the ``required`` URL template.
+    """
+    params = dict(item_params)
+    for key in shared_options:
+        if params[key] is None:
+            params[key] = module.params[key]
+
+    source = params.pop("source") or ("github" if params["github_args"] else "generic")
+    item = ItemModule(module, params)
+    if source == "github":
+        params["github_args"] = params["github_args"] or {}
+        for key in ("version_url_template", "download_url_template"):
+            params[key] = params[key] or GITHUB_ARGS_DEFAULT[key]
+        if params["github_api"]:
+            return item, github_api.GithubApiResolver(item)
+        return item, GithubVersionResolver(item)
+
+    if not params[required]:
+        module.fail_json(
+            f"{required} is required for generic releases", name=params["name"]
+        )
+    return item, GenericResolver(item)
+
+
+def run_one(module, resolver) -> Tuple[bool, Dict[str, Any]]:
+    # Maybe we want to uninstall something?
+    if module.params["state"] == "absent":
+        return absent.run(dict(module.params), module.check_mode)
+
+    sr = SoftwareRequest(module.params, resolver)
+
+    # Maybe we just want to see if *any* version is installed
+    if module.params["state"] == "present":
+        software = Software.from_param(module.params["name"])
+        return present.run(sr, module, software, resolver)
+
+    # Let's install the latest version
+    return latest.run(sr, module)
+
+
+def _run_item(module, resolver) -> Dict[str, Any]:
+    result = {"name": module.params["name"]}
+    try:
+        changed, context = run_one(module, resolver)
+    except SoftwareException as e:
+        result.update(failed=True, msg=str(e), **e.context)
+    except PermissionError as e:
+        result.update(failed=True, msg=e.strerror, errno=e.errno, path=e.filename)
+    else:
+        result.update(changed=changed, **context)
+    return result
+
+
+def run_all(items: List[Tuple[Any, Any]], max_workers: int) -> List[Dict[str, Any]]:
+    """Run each (module, resolver) pair on a bounded thread pool.
+
+    Results are returned in the same order as ``items``.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda item: _run_item(*item), items))
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from . import metrics
+from .checksum import CHUNK_SIZE
+
+
+def digest_key(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf8")).hexdigest()
+
+
+class ArtifactCache:
+    """A content addressed store of downloaded artifacts.
+
+    Artifacts are stored under ``objects/`` by the SHA-256 of their contents
+    and ``keys/`` maps a download URL and version to that digest, so the same
+    artifact downloaded from two URLs is only stored once. An object's mtime
+    is used as its last access time for LRU eviction.
+    """
+
+    def __init__(self, directory: Path, max_size: int) -> None:
+        self.directory = Path(directory).expanduser()
+        self.max_size = max_size
+        self.objects = self.directory / "objects"
+        self.keys = self.directory / "keys"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.keys.mkdir(parents=True, exist_ok=True)
+
+    def get(self, url: str, version: str) -> Optional[Path]:
+        key_path = self.keys / digest_key(url, version)
+        try:
+            digest = key_path.read_text().strip()
+        except FileNotFoundError:
+            return None
+
+        obj = self.objects / digest
+        if not obj.exists():
+            key_path.unlink(missing_ok=True)
+            return None
+        obj.touch()
+        return obj
+
+    def put(self, url: str, version: str, data: BinaryIO) -> Path:
+        tmp = self.objects / f".{uuid.uuid4().hex}"
+        sha256 = hashlib.sha256()
+        try:
+            with tmp.open("xb") as f:
+                for chunk in iter(lambda: data.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+                    f.write(chunk)
+            obj = self.objects / sha256.hexdigest()
+            tmp.replace(obj)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        key_path = self.keys / digest_key(url, version)
+        key_tmp = key_path.with_name(f".{uuid.uuid4().hex}")
+        key_tmp.write_text(obj.name)
+        key_tmp.replace(key_path)
+
+        self.evict(keep=obj)
+        return obj
+
+    def discard(self, url: str, version: str) -> None:
+        """Forget the artifact stored for ``url``, such as one found to be bad."""
+        key_path = self.keys / digest_key(url, version)
+        try:
+            digest = key_path.read_text().strip()
+        except FileNotFoundError:
+            return
+        key_path.unlink(missing_ok=True)
+        (self.objects / digest).unlink(missing_ok=True)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Remove least recently used objects until the cache fits."""
+        entries = []
+        total = 0
+        with os.scandir(self.objects) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, Path(entry.path)))
+                total += st.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if keep is not None and path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def from_params(params) -> Optional[ArtifactCache]:
+    if not params.get("cache_dir"):
+        return None
+    return ArtifactCache(params["cache_dir"], params["cache_max_size"] * 1024 * 1024)
+
+
+class VersionCache:
+    """Remembers the latest version resolved from a version URL.
+
+    Each entry is a small file under ``versions/`` named after the URL; its
+    mtime records when the version was resolved.
+    """
+
+    def __init__(self, directory: Path, ttl: int) -> None:
+        self.directory = Path(directory).expanduser() / "versions"
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, url: str) -> Optional[str]:
+        path = self.directory / digest_key(url)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            return path.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def put(self, url: str, version: str) -> None:
+        path = self.directory / digest_key(url)
+        tmp = path.with_name(f".{uuid.uuid4().hex}")
+        tmp.write_text(version)
+        tmp.replace(path)
+
+
+def latest_version(params, url: str, resolve: Callable[[], str]) -> str:
+    """Return the latest version for ``url``, using the version cache if enabled."""
+    if not params.get("cache_dir") or not params.get("version_cache_ttl"):
+        return resolve()
+
+    version_cache = VersionCache(params["cache_dir"], params["version_cache_ttl"])
+    version = version_cache.get(url)
+    if version is None:
+        version = resolve()
+        version_cache.put(url, version)
+    else:
+        metrics.count("cache_hits")
+    return version
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import posixpath
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Optional
+
+from . import metrics
+from . import mirrors
+from .errors import ChecksumMismatch, SoftwareException
+
+DEFAULT_ALGORITHM = "sha256"
+
+# Size of the reads made when streaming artifacts
+CHUNK_SIZE = 64 * 1024
+
+
+class Checksum:
+    """An expected digest such as ``sha256:<hex>``."""
+
+    def __init__(self, algorithm: str, digest: str) -> None:
+        if algorithm not in hashlib.algorithms_available:
+            raise SoftwareException("Unsupported checksum algorithm", algorithm=algorithm)
+        self.algorithm = algorithm
+        self.digest = digest.lower()
+
+    def __str__(self):
+        return f"{self.algorithm}:{self.digest}"
+
+    def verify(self, digests: Dict[str, str], **context) -> None:
+        actual = digests.get(self.algorithm)
+        if actual != self.digest:
+            raise ChecksumMismatch(
+                "Checksum mismatch", expected=str(self), actual=actual, **context
+            )
+
+
+class HashingReader:
+    """Wraps a stream and hashes the data as it is read."""
+
+    def __init__(self, fileobj: BinaryIO, algorithms: Iterable[str]) -> None:
+        self._fileobj = fileobj
+        self._hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        for h in self._hashes.values():
+            h.update(data)
+        self.size += len(data)
+        return data
+
+    def drain(self, chunk_size: int = CHUNK_SIZE) -> None:
+        """Read, and hash, whatever is left in the stream."""
+        while self.read(chunk_size):
+            pass
+
+    def digests(self) -> Dict[str, str]:
+        return {algorithm: h.hexdigest() for algorithm, h in self._hashes.items()}
+
+
+def algorithms(expected: Optional[Checksum]):
+    if expected and expected.algorithm != DEFAULT_ALGORITHM:
+        return (DEFAULT_ALGORITHM, expected.algorithm)
+    return (DEFAULT_ALGORITHM,)
+
+
+def literal(params) -> Optional[Checksum]:
+    """The checksum given directly in the ``checksum`` option, if any.
+
+    Unlike ``expected`` this never makes a request, so it is what no-op
+    checks compare recorded digests against.
+    """
+    spec = params.get("checksum")
+    if not spec or "://" in spec:
+        return None
+    algorithm, _, digest = spec.partition(":")
+    return Checksum(algorithm, digest)
+
+
+def expected(module, resolver, version: str) -> Optional[Checksum]:
+    """Work out the checksum an artifact must match.
+
+    ``checksum`` is either ``<algorithm>:<digest>`` or ``<algorithm>:<url>``
+    where the URL points at a checksums file such as ``checksums.txt`` or
+    ``<file>.sha256``. Resolvers may also provide a checksums URL of their
+    own, which GitHub releases do through ``github_args``.
+    """
+    params = module.params
+    spec = params.get("checksum")
+    if spec and "://" not in spec:
+        return literal(params)
+
+    if spec:
+        algorithm, _, url = spec.partition(":")
+        url = url.format(version=version, **params)
+    else:
+        url = resolver.checksums_url(version)
+        algorithm = DEFAULT_ALGORITHM
+        if not url:
+            return None
+
+    with metrics.phase("checksum"):
+        response, info = mirrors.fetch(module, url, resolver.report)
+        if info["status"] != 200:
+            raise SoftwareException(
+                f"Failed to download checksums: {url}", details=info
+            )
+        text = response.read().decode("utf8")
+
+    filename = posixpath.basename(resolver.download_url(version))
+    digest = find_digest(text, filename)
+    if digest is None:
+        raise SoftwareException(
+            "Checksum not found", url=url, filename=filename, version=version
+        )
+    return Checksum(algorithm, digest)
+
+
+def find_digest(text: str, filename: str) -> Optional[str]:
+    """Find the digest for ``filename`` in sha256sum style output.
+
+    A file with a single bare digest, as ``<file>.sha256`` assets often are,
+    applies to whatever file it was published for.
+    """
+    lines = [line.split() for line in text.splitlines() if line.strip()]
+    for fields in lines:
+        if len(fields) >= 2 and fields[-1].lstrip("*") == filename:
+            return fields[0]
+    if len(lines) == 1 and len(lines[0]) == 1:
+        return lines[0][0]
+    return None
+
+
+def record(path: Path, record_path: Path, digests: Dict[str, str]) -> None:
+    """Record digests of ``path`` along with enough stat data to trust them."""
+    st = path.stat()
+    data = dict(digests, size=st.st_size, mtime_ns=st.st_mtime_ns)
+    tmp = record_path.with_name(f".{uuid.uuid4().hex}")
+    tmp.write_text(json.dumps(data, sort_keys=True))
+    tmp.replace(record_path)
+
+
+def recorded(path: Path, record_path: Path) -> Optional[Dict[str, str]]:
+    """The recorded digests of ``path``, if it has not changed since.
+
+    Only ``stat`` is used, so confirming an install never reads the file.
+    """
+    try:
+        data = json.loads(record_path.read_text())
+        st = os.stat(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.pop("size", None) != st.st_size or data.pop("mtime_ns", None) != st.st_mtime_ns:
+        return None
+    return data
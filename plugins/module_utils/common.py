@@ -1,5 +1,6 @@
 from pathlib import Path
 
+from . import metrics
 from .errors import SoftwareException
 from .versioned_path import VersionedPath
 
@@ -14,21 +15,30 @@ class SoftwareRequest:
         self.state = params.state
 
         if "=" in params.name:
-            self.name, self.version = params.name.split("=")
+            self.name, self._version = params.name.split("=")
         else:
             self.name = params.name
-            self.version = None
+            self._version = None
 
-        if self.state == "latest" and self.version:
+        if self.state == "latest" and self._version:
             raise SoftwareException("Specify state:latest or (state:present and a specific version)")
 
-        if self.state == "latest" or (self.state == "present" and not self.version):
-            self.version = resolver.get_latest()
-
         self.dest = params.dest
         self.extra_params = params
         self.resolver = resolver
 
+    @property
+    def version(self):
+        """The requested version, resolving the latest one on first use.
+
+        Resolution is deferred so that callers that can answer from the
+        filesystem alone never make a network request.
+        """
+        if self._version is None:
+            with metrics.phase("resolve"):
+                self._version = self.resolver.get_latest()
+        return self._version
+
 
 class Software:
     def __init__(self, name, version=None):
@@ -0,0 +1,94 @@
+from typing import BinaryIO, Optional, Tuple
+
+from . import metrics
+from .errors import SoftwareException
+
+# Leading bytes of each supported format
+MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"BZh", "bz2"),
+)
+MAGIC_SIZE = max(len(magic) for magic, _ in MAGIC)
+
+
+def detect(head: bytes) -> Optional[str]:
+    """The codec a stream starting with ``head`` is compressed with, if any."""
+    for magic, codec in MAGIC:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+class _Rewound:
+    """``raw`` with ``head``, already read from it, put back in front."""
+
+    def __init__(self, head: bytes, raw: BinaryIO) -> None:
+        self._head = head
+        self._raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._head:
+            return self._raw.read(size)
+        if size < 0:
+            data, self._head = self._head + self._raw.read(), b""
+        else:
+            data, self._head = self._head[:size], self._head[size:]
+        return data
+
+
+class _Decompressing:
+    """Reads from a decompressing file, timed as ``extract``.
+
+    ``errors`` are the exceptions the codec raises for corrupt data.
+    """
+
+    def __init__(self, codec: str, raw: BinaryIO, errors: tuple) -> None:
+        self.codec = codec
+        self._raw = raw
+        self._errors = errors
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            with metrics.phase("extract"):
+                return self._raw.read(size)
+        except self._errors as e:
+            raise SoftwareException(
+                "Failed to decompress download", codec=self.codec, error=str(e)
+            )
+
+
+def decompress(stream: BinaryIO) -> Tuple[str, BinaryIO]:
+    """Detect how ``stream`` is compressed and decompress it as it is read.
+
+    Only a buffer's worth of data is held at a time, so this works on a
+    download while it arrives. Returns the codec and the decompressed
+    stream.
+    """
+    head = b""
+    while len(head) < MAGIC_SIZE:
+        data = stream.read(MAGIC_SIZE - len(head))
+        if not data:
+            break
+        head += data
+
+    codec = detect(head)
+    if codec is None:
+        raise SoftwareException("Unknown compression format", magic=head.hex())
+
+    raw = _Rewound(head, stream)
+    errors = (OSError, EOFError)
+    if codec == "gzip":
+        import gzip
+
+        decompressed = gzip.GzipFile(fileobj=raw, mode="rb")
+    elif codec == "xz":
+        import lzma
+
+        decompressed = lzma.LZMAFile(raw)
+        errors += (lzma.LZMAError,)
+    else:
+        import bz2
+
+        decompressed = bz2.BZ2File(raw)
+    return codec, _Decompressing(codec, decompressed, errors)
@@ -0,0 +1,122 @@
+import fcntl
+import json
+import os
+import shutil
+import stat
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from . import checksum
+from .checksum import CHUNK_SIZE
+from .versioned_path import octal_mode
+
+# ioctl request number of FICLONE from linux/fs.h
+FICLONE = 0x40049409
+
+# Used for the index when there is no cache_dir to keep it in
+DEFAULT_DIRECTORY = "~/.cache/dstanek.software"
+
+
+class DedupeIndex:
+    """Finds installed targets by digest so identical ones can share data.
+
+    ``installed/<algorithm>-<digest>`` lists the targets, and their digest
+    records, that were written with that content. Entries are only a hint:
+    a target is used as a source only while its record says it is
+    unchanged, and only if it is on the same filesystem as the new target.
+
+    With ``hardlink`` a new target becomes another link to the same inode,
+    provided it needs no different permissions. Otherwise, and with
+    ``reflink``, the data is cloned with ``FICLONE`` or, failing that,
+    ``copy_file_range``, falling back to a plain copy.
+    """
+
+    def __init__(self, directory: Path, mode: str) -> None:
+        self.directory = Path(directory).expanduser() / "installed"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+
+    def _entry_path(self, algorithm: str, digest: str) -> Path:
+        return self.directory / f"{algorithm}-{digest}"
+
+    def _entries(self, algorithm: str, digest: str):
+        try:
+            return json.loads(self._entry_path(algorithm, digest).read_text())
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def find(
+        self, digests: Dict[str, str], dest_dir: Path
+    ) -> Optional[Tuple[Path, Dict[str, str]]]:
+        """An unchanged target on ``dest_dir``'s filesystem with ``digests``.
+
+        Returns the target and all of its recorded digests.
+        """
+        device = os.stat(dest_dir).st_dev
+        for algorithm, digest in digests.items():
+            for path, record_path in self._entries(algorithm, digest):
+                recorded = checksum.recorded(Path(path), Path(record_path))
+                if not recorded or recorded.get(algorithm) != digest:
+                    continue
+                if os.stat(path).st_dev == device:
+                    return Path(path), recorded
+        return None
+
+    def add(self, path: Path, record_path: Path, digests: Dict[str, str]) -> None:
+        for algorithm, digest in digests.items():
+            entries = [
+                entry
+                for entry in self._entries(algorithm, digest)
+                if entry[0] != str(path) and os.path.exists(entry[0])
+            ]
+            entries.append([str(path), str(record_path)])
+
+            entry_path = self._entry_path(algorithm, digest)
+            tmp = entry_path.with_name(f".{uuid.uuid4().hex}")
+            tmp.write_text(json.dumps(entries))
+            tmp.replace(entry_path)
+
+    def clone(self, source: Path, target: Path, file_args) -> str:
+        """Create ``target`` from ``source``; returns the method used."""
+        if self.mode == "hardlink" and _shareable(source, file_args):
+            os.link(source, target)
+            return "hardlink"
+
+        with source.open("rb") as src, target.open("xb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return "reflink"
+            except OSError:
+                pass
+            try:
+                # Filesystems that can share extents do so here as well
+                size = os.fstat(src.fileno()).st_size
+                while size > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), size)
+                    if not copied:
+                        break
+                    size -= copied
+                return "copy_file_range"
+            except (AttributeError, OSError):
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                return "copy"
+
+
+def _shareable(source: Path, file_args) -> bool:
+    # A hardlink shares permissions too, so only link when nothing would
+    # have to change on the existing file.
+    if file_args["owner"] or file_args["group"]:
+        return False
+    mode = octal_mode(file_args["mode"])
+    return mode is not None and stat.S_IMODE(source.stat().st_mode) == mode
+
+
+def from_params(params) -> Optional[DedupeIndex]:
+    mode = params.get("dedupe") or "none"
+    if mode == "none":
+        return None
+    return DedupeIndex(params.get("cache_dir") or DEFAULT_DIRECTORY, mode)
@@ -1,51 +1,580 @@
+import contextlib
+import http.client
+import io
+import os
+import shutil
+import uuid
 from pathlib import Path
+from typing import BinaryIO, Optional
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import fetch_url
+from ansible_collections.dstanek.software.plugins.module_utils import cache
+from ansible_collections.dstanek.software.plugins.module_utils import checksum
+from ansible_collections.dstanek.software.plugins.module_utils import compression
+from ansible_collections.dstanek.software.plugins.module_utils import dedupe
+from ansible_collections.dstanek.software.plugins.module_utils import metrics
+from ansible_collections.dstanek.software.plugins.module_utils import mirrors
 from ansible_collections.dstanek.software.plugins.module_utils import render
+from ansible_collections.dstanek.software.plugins.module_utils import retry
+from ansible_collections.dstanek.software.plugins.module_utils import validators
+from ansible_collections.dstanek.software.plugins.module_utils.checksum import CHUNK_SIZE
+from ansible_collections.dstanek.software.plugins.module_utils.manifest import Manifest
 from ansible_collections.dstanek.software.plugins.module_utils.versioned_path import (
     VersionedPath,
 )
-from .errors import SoftwareException
+from .errors import ChecksumMismatch, SoftwareException
 
+# Files smaller than this are not worth splitting into parallel downloads
+PARALLEL_MIN_SIZE = 8 * 1024 * 1024
 
-def slurp(module: AnsibleModule, version: str, **extra_context) -> bytes:
+
+def render_url(module: AnsibleModule, version: str, **extra_context) -> str:
     template = module.params["download_url_template"]
-    url = template.format(version=version, **module.params, **extra_context)
-    response, info = fetch_url(module, url)
+    return template.format(version=version, **module.params, **extra_context)
+
+
+def stream(
+    module: AnsibleModule,
+    version: str,
+    report: Optional[dict] = None,
+    conditional: bool = False,
+    url: Optional[str] = None,
+    **extra_context,
+) -> Optional[BinaryIO]:
+    """Open the download URL and return the response unread.
+
+    Callers are expected to consume the response in chunks so that a large
+    release never has to fit in memory. When a ``cache_dir`` is configured
+    the artifact is served from, or stored in, the local artifact cache and
+    ``report["cached"]`` records which one happened.
+
+    If ``conditional`` is true the caller already has this version on disk,
+    so recorded validators are sent with the request and ``None`` is returned
+    when the server answers ``304 Not Modified``.
+
+    ``url`` overrides the rendered download URL, for resolvers that learn
+    the artifact's location from an API.
+    """
+    with metrics.phase("download"):
+        return metrics.reader(
+            _open(module, version, report, conditional, url, **extra_context)
+        )
+
+
+def _open(
+    module: AnsibleModule,
+    version: str,
+    report: Optional[dict],
+    conditional: bool,
+    url: Optional[str],
+    **extra_context,
+) -> Optional[BinaryIO]:
+    # Template mirrors are rendered from the same context as the URL
+    context = None
+    if url is None:
+        url = render_url(module, version, **extra_context)
+        context = dict(extra_context, version=version)
+    if report is None:
+        report = {}
+
+    artifact_cache = cache.from_params(module.params)
+    if artifact_cache:
+        cached_path = artifact_cache.get(url, version)
+        report["cached"] = cached_path is not None
+        if cached_path:
+            metrics.count("cache_hits")
+            return cached_path.open("rb")
+
+    validator_store = validators.from_params(module.params, module.check_mode)
+    headers = validator_store.headers(url) if validator_store and conditional else {}
+
+    download_chunks = module.params.get("download_chunks", 1)
+    download_attempts = module.params.get("download_attempts", 1)
+    downloaded = None
+    if download_chunks > 1 or download_attempts > 1:
+        if artifact_cache:
+            partial = artifact_cache.directory / "partial" / cache.digest_key(url, version)
+        else:
+            partial = Path(module.tmpdir) / f"download-{uuid.uuid4().hex}"
+        for mirror, candidate in mirrors.candidates(module, url, context):
+            try:
+                if download_chunks > 1:
+                    downloaded = parallel(module, candidate, partial, headers, report)
+                if downloaded is None and download_attempts > 1:
+                    downloaded = resumable(module, candidate, partial, headers, report)
+            except SoftwareException:
+                if mirror is None:
+                    raise
+                continue
+            break
+        if module.params.get("mirrors"):
+            report["mirror"] = mirror
+
+    # Parallel downloads decline servers without range support, which are
+    # then downloaded in a single stream below unless resuming
+    if downloaded is not None:
+        complete, info = downloaded
+        if complete is None:
+            return None
+        if validator_store:
+            validator_store.update(url, info)
+        if artifact_cache:
+            with complete.open("rb") as f:
+                cached_path = artifact_cache.put(url, version, f)
+            complete.unlink()
+            return cached_path.open("rb")
+        return complete.open("rb")
+
+    response, info = mirrors.fetch(
+        module, url, report, context=context, headers=headers
+    )
+    if headers and info["status"] == 304:
+        return None
     if info["status"] != 200:
         raise SoftwareException(
             f"Failed to download file: {url}",
             details=info,
         )
-    return response.read()
+    if validator_store:
+        validator_store.update(url, info)
+
+    response = metrics.reader(response, "bytes_transferred")
+    if artifact_cache:
+        return artifact_cache.put(url, version, response).open("rb")
+    return response
+
+
+def resumable(
+    module: AnsibleModule, url: str, partial: Path, headers: dict, report: dict
+):
+    """Download ``url`` into ``partial``, resuming with Range requests.
+
+    Up to ``download_attempts`` requests are made. Whatever was received
+    before a connection dropped is kept and the next attempt asks only for
+    the remaining bytes. Returns the completed path and the final response
+    info, or ``(None, info)`` for a ``304 Not Modified``.
+
+    The ETag or Last-Modified of the file is stored beside ``partial`` and
+    sent as ``If-Range``, so a file that changed since is downloaded again
+    from the start. A partial file without one is discarded.
+    """
+    partial.parent.mkdir(parents=True, exist_ok=True)
+    validator_path = partial.with_name(f"{partial.name}.validator")
+    info = {}
+    for _ in range(module.params["download_attempts"]):
+        validator = validator_path.read_text() if validator_path.exists() else None
+        if not validator:
+            # There is no telling which version of the file it came from
+            partial.unlink(missing_ok=True)
+        offset = partial.stat().st_size if partial.exists() else 0
+        if offset:
+            # Validators describe the complete file, not the partial one
+            request_headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+        else:
+            request_headers = dict(headers)
+
+        response, info = retry.fetch(module, url, report, headers=request_headers)
+        status = info["status"]
+        if status == 304 and not offset and headers:
+            return None, info
+        if status == 416:
+            # The partial file no longer matches what the server has
+            partial.unlink(missing_ok=True)
+            continue
+        if status == -1 or status >= 500:
+            # Connection failures and server errors are worth another try
+            continue
+        if status not in (200, 206):
+            break
+
+        if status == 206:
+            mode, expected = "ab", _content_range_total(info)
+        else:
+            # The whole file, either a first attempt or one that has changed
+            mode, expected = "wb", _int_or_none(info.get("content-length"))
+            validator = info.get("etag") or info.get("last-modified")
+            if validator:
+                validator_path.write_text(validator)
+            else:
+                validator_path.unlink(missing_ok=True)
+
+        try:
+            with partial.open(mode) as f:
+                shutil.copyfileobj(
+                    metrics.reader(response, "bytes_transferred"), f, CHUNK_SIZE
+                )
+        except (OSError, http.client.HTTPException):
+            continue
+
+        if expected is not None and partial.stat().st_size != expected:
+            continue
+        validator_path.unlink(missing_ok=True)
+        return partial, info
+
+    raise SoftwareException(
+        f"Failed to download file: {url}",
+        details=info,
+    )
+
+
+def parallel(
+    module: AnsibleModule, url: str, path: Path, headers: dict, report: dict
+):
+    """Download ``url`` into ``path`` over concurrent Range requests.
+
+    The first request asks for the first ``PARALLEL_MIN_SIZE`` bytes, so a
+    file no bigger than that is complete after it. The rest of a larger file
+    is split into ``download_chunks - 1`` ranges that are fetched on a thread
+    pool along with the first. Each range is written at its own offset in a
+    file preallocated at full size, so the file needs no assembling, and is
+    retried from where it got to up to ``download_attempts`` times.
+
+    Returns ``None`` when the server does not answer the first request with
+    a range, so the caller can fall back to a single stream. Otherwise
+    returns like ``resumable``.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    response, info = retry.fetch(
+        module,
+        url,
+        report,
+        headers=dict(headers, Range=f"bytes=0-{PARALLEL_MIN_SIZE - 1}"),
+    )
+    if info["status"] == 304 and headers:
+        return None, info
+    size = _content_range_total(info)
+    if info["status"] != 206 or size is None:
+        if response is not None:
+            response.close()
+        return None
+
+    first_end = min(PARALLEL_MIN_SIZE, size)
+    step = -(-(size - first_end) // (module.params["download_chunks"] - 1))
+    ranges = [(0, first_end)] + [
+        (start, min(start + step, size)) for start in range(first_end, size, step or 1)
+    ]
+    # Every range must come from the same version of the file
+    validator = info.get("etag") or info.get("last-modified")
+    range_headers = {"If-Range": validator} if validator else {}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with path.open("wb") as f:
+            _preallocate(f.fileno(), size)
+            with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                futures = [
+                    pool.submit(
+                        _fetch_range,
+                        module,
+                        url,
+                        f.fileno(),
+                        start,
+                        end,
+                        range_headers,
+                        response if start == 0 else None,
+                    )
+                    for start, end in ranges
+                ]
+                results = [future.result() for future in futures]
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    # Range requests were made on the pool's threads, so are counted here
+    requests = sum(r for r, _ in results)
+    report["attempts"] = report.get("attempts", 0) + requests
+    report["chunks"] = len(ranges)
+    metrics.count("requests", requests)
+    metrics.count("bytes_transferred", sum(received for _, received in results))
+    return path, info
+
+
+def _preallocate(fd: int, size: int) -> None:
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        # Not available on every platform and filesystem
+        os.ftruncate(fd, size)
+
+
+def _fetch_range(
+    module: AnsibleModule,
+    url: str,
+    fd: int,
+    start: int,
+    end: int,
+    headers: dict,
+    response=None,
+):
+    """Write bytes ``start`` to ``end`` of ``url`` at the same offsets of ``fd``.
+
+    ``response`` is an open response for the range, if there is one already.
+    Returns the number of requests made and bytes received.
+    """
+    pos, requests, received, info = start, 0, 0, {}
+    for _ in range(module.params["download_attempts"]):
+        if response is None:
+            response, info = retry.fetch(
+                module, url, headers=dict(headers, Range=f"bytes={pos}-{end - 1}")
+            )
+            requests += info["attempts"]
+            if info["status"] != 206:
+                if response is not None:
+                    response.close()
+                response = None
+                # Connection failures and server errors are worth another try
+                if info["status"] == -1 or info["status"] >= 500:
+                    continue
+                break
+
+        while pos < end:
+            try:
+                data = response.read(min(CHUNK_SIZE, end - pos))
+            except (OSError, http.client.HTTPException):
+                break
+            if not data:
+                break
+            received += len(data)
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(fd, view, pos)
+                view = view[written:]
+                pos += written
+        response.close()
+        response = None
+        if pos == end:
+            return requests, received
+
+    raise SoftwareException(
+        f"Failed to download file: {url}", details=info, range=f"{start}-{end - 1}"
+    )
+
+
+def _content_range_total(info: dict) -> Optional[int]:
+    # Content-Range: bytes 100-199/200
+    content_range = info.get("content-range", "")
+    return _int_or_none(content_range.rpartition("/")[2])
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def slurp(module: AnsibleModule, version: str, **extra_context) -> bytes:
+    return stream(module, version, **extra_context).read()
 
 
 def executable(resolver, filename: str, module, dest: Path, version: str):
     if dest.is_dir():
         dest = dest / filename
     dest = VersionedPath(dest)
-    # TODO: should add a check here so that we don't wipe out something
-    #       we don't own, but YOLO.
+    _check_managed([dest])
 
-    if dest.release_version() == version and dest.target.exists():
-        module.exit_json(changed=False, meta={"dest": str(dest), "version": version})
+    installed = Manifest(dest.path.parent)
+    literal = checksum.literal(module.params)
+    if installed.installed(filename, version, literal and str(literal)):
+        return False, {"dest": str(dest), "version": version, **resolver.report}
+
+    if (
+        dest.release_version() == version
+        and dest.target.exists()
+        and dest.intact(version, literal)
+    ):
+        # Installed before there was a manifest
+        _record(installed, resolver, filename, [dest], version)
+        return False, {"dest": str(dest), "version": version, **resolver.report}
+
+    keep_versions = module.params["keep_versions"]
+    # A version kept on disk is switched back to without any requests
+    if dest.kept(version, literal):
+        dest.relink(version, keep_versions)
+        _record(installed, resolver, filename, [dest], version)
+        return True, {"dest": str(dest), "version": version, **resolver.report}
 
     file_args = module.load_file_common_arguments(module.params)
+    expected = checksum.expected(module, resolver, version)
 
-    data = resolver.download(version)
-    dest.write_target(data, version, file_args)
-    dest.relink(version)
-    return True, {"dest": str(dest), "version": version}
+    index = dedupe.from_params(module.params)
+    meta = {"dest": str(dest), "version": version}
 
+    # A known checksum can be matched to an installed file without downloading
+    found = None
+    if index and expected and not dest.target_path(version).exists():
+        found = index.find({expected.algorithm: expected.digest}, dest.path.parent)
 
-def tarball(resolver, module: AnsibleModule, dest_dir: Path, version: str):
+    if found:
+        dest.link_target(*found, version, file_args, index)
+        meta["checksum"] = str(expected)
+    else:
+        on_disk = dest.target_path(version).exists() and dest.intact(version, expected)
+        with _discarding_mismatch(module, resolver, version):
+            data = resolver.download(version, conditional=on_disk)
+            if data is not None:
+                digests = dest.write_target(data, version, file_args, expected, index)
+                meta["checksum"] = str(expected or f"sha256:{digests['sha256']}")
+    if dest.deduplicated:
+        meta["deduplicated"] = dest.deduplicated
+    dest.relink(version, keep_versions)
+    _record(installed, resolver, filename, [dest], version, meta.get("checksum"))
+    return True, {**meta, **resolver.report}
 
-    # TODO: valudate that dest_dir is only a directory
 
-    import io
-    import tarfile
+def compressed_executable(resolver, filename: str, module, dest: Path, version: str):
+    """Install an executable published compressed, such as ``tool.gz``.
+
+    The codec is detected from the artifact's first bytes and the download is
+    decompressed as it streams to a file beside the versioned target, so the
+    compressed artifact is never stored. A checksum is that of the compressed
+    artifact, as projects publish it, and the target is only replaced once it
+    matches.
+    """
+    if dest.is_dir():
+        dest = dest / filename
+    dest = VersionedPath(dest)
+
+    installed = Manifest(dest.path.parent)
+    result = _without_download(resolver, module, installed, [dest], version)
+    if result:
+        return result
+
+    file_args = module.load_file_common_arguments(module.params)
+    expected = checksum.expected(module, resolver, version)
+    index = dedupe.from_params(module.params)
+
+    reader = checksum.HashingReader(
+        resolver.download(version), checksum.algorithms(expected)
+    )
+    codec, data = compression.decompress(reader)
+    staged, digests = dest.stage(data, version)
+    try:
+        reader.drain()
+        if expected:
+            with _discarding_mismatch(module, resolver, version):
+                expected.verify(reader.digests(), version=version)
+        dest.install(staged, version, file_args, digests, index)
+    finally:
+        staged.unlink(missing_ok=True)
+
+    digest = str(expected or f"sha256:{reader.digests()['sha256']}")
+    meta = {
+        "dest": str(dest),
+        "version": version,
+        "checksum": digest,
+        "compression": codec,
+    }
+    if dest.deduplicated:
+        meta["deduplicated"] = dest.deduplicated
+    dest.relink(version, module.params["keep_versions"])
+    _record(installed, resolver, filename, [dest], version, digest)
+    return True, {**meta, **resolver.report}
+
+
+@contextlib.contextmanager
+def _discarding_mismatch(module: AnsibleModule, resolver, version: str):
+    """Drop the cached artifact when it fails its checksum.
+
+    Otherwise every later run would be served the same bad artifact from
+    the cache, even after upstream has been fixed.
+    """
+    try:
+        yield
+    except ChecksumMismatch:
+        artifact_cache = cache.from_params(module.params)
+        if artifact_cache:
+            artifact_cache.discard(resolver.download_url(version), version)
+        raise
+
+
+def _check_managed(versioned_paths) -> None:
+    for vp in versioned_paths:
+        if not vp.managed():
+            raise SoftwareException(
+                "Link is not managed by this collection; manual intervention required",
+                path=str(vp),
+                target=str(vp.target),
+            )
+
+
+def _record(
+    installed: Manifest,
+    resolver,
+    name: str,
+    versioned_paths,
+    version: str,
+    checksum: Optional[str] = None,
+) -> None:
+    installed.record(
+        name,
+        version,
+        versioned_paths,
+        url=resolver.download_url(version),
+        checksum=checksum,
+    )
 
+
+def _software_name(module: AnsibleModule) -> str:
+    # Works for both package and package=1.0
+    return module.params["name"].split("=")[0]
+
+
+def plan(resolver, module, dest_dir: Path, filename: str, version: str):
+    """Work out what installing ``version`` would change.
+
+    Used for check mode, so only the version is resolved; nothing is
+    downloaded, not even a checksums file. The files that would change are
+    returned along with the versions they would move between, and a diff when
+    one was asked for.
+    """
+    release_type = module.params["release_type"]
+    if release_type in ("executable", "compressed_executable"):
+        versioned_paths = [VersionedPath(dest_dir / filename)]
+    else:
+        versioned_paths, _ = _archive_targets(module, dest_dir, version)
+
+    # Only an executable is installed as downloaded; the checksum of an
+    # archive or compressed file says nothing about the installed files, which
+    # are checked against their digest records instead, as installing does.
+    expected = checksum.literal(module.params) if release_type == "executable" else None
+    meta = {"dest": str(dest_dir), "version": version, **resolver.report}
+    if Manifest(dest_dir).installed(filename, version, expected and str(expected)):
+        return False, meta
+
+    changes = [
+        vp
+        for vp in versioned_paths
+        if not (
+            vp.release_version() == version
+            and vp.target.exists()
+            and vp.intact(version, expected)
+        )
+    ]
+    if not changes:
+        return False, meta
+
+    meta["old_version"] = changes[0].release_version()
+    meta["files"] = [str(vp) for vp in changes]
+    if module._diff:
+        meta["diff"] = {
+            "before": "".join(
+                f"{vp} -> {vp.target}\n" for vp in changes if vp.target
+            ),
+            "after": "".join(
+                f"{vp} -> {vp.target_path(version)}\n" for vp in changes
+            ),
+        }
+    return True, meta
+
+
+def _archive_targets(module: AnsibleModule, dest_dir: Path, version: str):
+    """The versioned paths of an archive's files and the members they need.
+
+    Returns the paths along with a map of each member name in the archive to
+    the paths it should be written to.
+    """
     p = module.params
 
     file_specs = p["tarball_args"].get("files")
@@ -56,31 +585,343 @@ def tarball(resolver, module: AnsibleModule, dest_dir: Path, version: str):
         VersionedPath(dest_dir / file_spec["dest"]) for file_spec in file_specs
     ]
 
-    # If all links are correct then don't do anything
-    if all(
-        vp.release_version() == version and vp.target.exists() for vp in versioned_paths
-    ):
-        module.exit_json(
-            changed=False, meta={"dest": str(dest_dir), "version": version}
-        )
+    wanted = {}
+    for file_spec, dest in zip(file_specs, versioned_paths):
+        filename = render.template(file_spec["src"], **module.params, version=version)
+        wanted.setdefault(filename, []).append(dest)
+    return versioned_paths, wanted
+
+
+def _installed(vp: VersionedPath, version: str) -> bool:
+    return vp.release_version() == version and vp.target.exists() and vp.intact(version)
+
+
+def _without_download(resolver, module, installed: Manifest, versioned_paths, version):
+    """The result for an archive or compressed release that needs no download.
+
+    That is when it is already installed, which the manifest answers
+    without walking the links, or when a kept version is switched back to.
+    """
+    name = _software_name(module)
+    _check_managed(versioned_paths)
+    result = {"dest": str(installed.directory), "version": version, **resolver.report}
+    if installed.installed(name, version):
+        return False, result
+
+    if all(_installed(vp, version) for vp in versioned_paths):
+        # Installed before there was a manifest
+        _record(installed, resolver, name, versioned_paths, version)
+        return False, result
+
+    # Versions kept on disk are switched back to without any requests
+    if all(vp.kept(version) for vp in versioned_paths):
+        for vp in versioned_paths:
+            vp.relink(version, module.params["keep_versions"])
+        _record(installed, resolver, name, versioned_paths, version)
+        return True, result
+    return None
+
+
+def _stage_member(data, dests, version: str, staged: list) -> None:
+    """Stage an archive member for each of the paths that want it.
+
+    Each path and its temporary file are appended to ``staged`` as they are
+    written, so the caller can discard them all if a later step fails.
+    """
+    tmp, digests = dests[0].stage(data, version)
+    staged.append((dests[0], tmp, digests))
+    for dest in dests[1:]:
+        with tmp.open("rb") as f:
+            copy, digests = dest.stage(f, version)
+        staged.append((dest, copy, digests))
+
+
+def _install_staged(staged: list, version: str, file_args, index) -> None:
+    for dest, tmp, digests in staged:
+        dest.install(tmp, version, file_args, digests, index)
+
+
+def _discard_staged(staged: list) -> None:
+    for _, tmp, _ in staged:
+        tmp.unlink(missing_ok=True)
+
+
+def tarball(resolver, module: AnsibleModule, dest_dir: Path, version: str):
+
+    # TODO: valudate that dest_dir is only a directory
+
+    import tarfile
 
-    data = resolver.download(version)
-    tarball_data = io.BytesIO(data)
-    tf = tarfile.open(fileobj=tarball_data, mode="r:gz")
-    #print(tf.getnames())
+    versioned_paths, wanted = _archive_targets(module, dest_dir, version)
+
+    installed = Manifest(dest_dir)
+    result = _without_download(resolver, module, installed, versioned_paths, version)
+    if result:
+        return result
+
+    # Stream the archive so members are extracted as the download arrives
+    # rather than after the whole tarball has been read into memory.
+    file_args = module.load_file_common_arguments(module.params)
+    expected = checksum.expected(module, resolver, version)
+    data = resolver.download(
+        version,
+        conditional=all(
+            vp.target_path(version).exists() and vp.intact(version)
+            for vp in versioned_paths
+        ),
+    )
+    if data is None:
+        # Not modified and every target is already on disk
+        for dest in versioned_paths:
+            dest.relink(version, module.params["keep_versions"])
+        _record(installed, resolver, _software_name(module), versioned_paths, version)
+        return True, {"dest": str(dest), "version": version, **resolver.report}
+
+    # The archive is hashed as it streams; members are staged beside their
+    # versioned targets and only moved into place once the whole archive
+    # checks out, so a tampered download never replaces a target.
+    reader = checksum.HashingReader(data, checksum.algorithms(expected))
+    index = dedupe.from_params(module.params)
+    staged = []
+    try:
+        # gzip, bzip2 and xz are detected from the stream's first bytes
+        with metrics.phase("extract"), tarfile.open(fileobj=reader, mode="r|*") as tf:
+            for member in tf:
+                if member.name not in wanted:
+                    continue
+                dests = wanted.pop(member.name)
+                _stage_member(tf.extractfile(member), dests, version, staged)
+                if not wanted:
+                    break
+
+        if wanted:
+            raise SoftwareException(
+                "Files not found in tarball", files=sorted(wanted), version=version
+            )
+
+        reader.drain()
+        if expected:
+            with _discarding_mismatch(module, resolver, version):
+                expected.verify(reader.digests(), version=version)
+        _install_staged(staged, version, file_args, index)
+    finally:
+        _discard_staged(staged)
+
+    written = [dest for dest, _, _ in staged]
+    for dest in written:
+        dest.relink(version, module.params["keep_versions"])
+    digest = str(expected or f"sha256:{reader.digests()['sha256']}")
+    _record(installed, resolver, _software_name(module), written, version, digest)
+    return True, {
+        "dest": str(dest),
+        "version": version,
+        "checksum": digest,
+        **resolver.report,
+    }
+
+
+def zip_archive(resolver, module: AnsibleModule, dest_dir: Path, version: str):
+    """Install files from a zip release.
+
+    Zip archives keep their index, the central directory, at the end of the
+    file. When the server supports ``Range`` requests only that and the
+    members that are wanted are transferred, which is a small fraction of a
+    large bundle. Otherwise, or when the whole archive is needed to verify a
+    checksum or fill the artifact cache, it is downloaded to a temporary
+    file first.
+    """
+    import tempfile
+    import zipfile
+
+    p = module.params
+    versioned_paths, wanted = _archive_targets(module, dest_dir, version)
+
+    installed = Manifest(dest_dir)
+    result = _without_download(resolver, module, installed, versioned_paths, version)
+    if result:
+        return result
 
     file_args = module.load_file_common_arguments(module.params)
-    for file_spec in file_specs:
-        dest = VersionedPath(dest_dir / file_spec["dest"])
+    expected = checksum.expected(module, resolver, version)
+    index = dedupe.from_params(module.params)
+
+    archive = None
+    meta = {"dest": str(dest_dir), "version": version}
+    if not expected and not p.get("cache_dir") and not p.get("staged_artifact"):
+        archive = open_ranged(module, resolver.download_url(version), resolver.report)
+    if archive is None:
+        reader = checksum.HashingReader(
+            resolver.download(version), checksum.algorithms(expected)
+        )
+        archive = tempfile.TemporaryFile(dir=module.tmpdir)
+        shutil.copyfileobj(reader, archive, CHUNK_SIZE)
+        if expected:
+            with _discarding_mismatch(module, resolver, version):
+                expected.verify(reader.digests(), version=version)
+        meta["checksum"] = str(expected or f"sha256:{reader.digests()['sha256']}")
+    else:
+        resolver.report["ranged"] = True
+
+    try:
+        with metrics.phase("extract"), archive, zipfile.ZipFile(archive) as zf:
+            members = {info.filename: info for info in zf.infolist()}
+            missing = sorted(set(wanted) - set(members))
+            if missing:
+                raise SoftwareException(
+                    "Files not found in zip", files=missing, version=version
+                )
+            if isinstance(archive, RangeReader):
+                # A member's data ends where the next local header, or the
+                # central directory, starts.
+                archive.boundaries = sorted(
+                    {info.header_offset for info in members.values()} | {zf.start_dir}
+                )
+
+            staged = []
+            try:
+                for name, dests in wanted.items():
+                    with zf.open(members[name]) as f:
+                        _stage_member(f, dests, version, staged)
+                _install_staged(staged, version, file_args, index)
+            finally:
+                _discard_staged(staged)
+    except zipfile.BadZipFile as e:
+        raise SoftwareException("Invalid zip archive", error=str(e), version=version)
+
+    for dest in versioned_paths:
+        dest.relink(version, module.params["keep_versions"])
+    _record(
+        installed, resolver, _software_name(module), versioned_paths, version,
+        meta.get("checksum"),
+    )
+    return True, {**meta, **resolver.report}
 
-        # New style substitution
-        filename = render.string(file_spec["src"], **module.params, version=version)
 
-        # TODO deprecate old style substitution
-        filename = file_spec["src"].format(**module.params)
+# Enough to hold the end of central directory record, including the longest
+# possible comment, and the central directories of most archives.
+TAIL_SIZE = 64 * 1024 + 22
+
+
+def open_ranged(module: AnsibleModule, url: str, report: dict):
+    """Open ``url`` as a seekable file, if the server supports ranges.
+
+    The tail of the file is fetched straight away as that is where readers
+    of zip archives start. Returns ``None`` when the server ignores the
+    ``Range`` header.
+    """
+    for mirror, candidate in mirrors.candidates(module, url):
+        response, info = retry.fetch(
+            module, candidate, report, headers={"Range": f"bytes=-{TAIL_SIZE}"}
+        )
+        size = _content_range_total(info)
+        if info["status"] == 206 and size is not None:
+            if module.params.get("mirrors"):
+                report["mirror"] = mirror
+            tail = response.read()
+            metrics.count("bytes_transferred", len(tail))
+            return RangeReader(module, candidate, report, size, tail)
+        if response is not None:
+            response.close()
+        if info["status"] in (200, 416):
+            return None
+    raise SoftwareException(f"Failed to download file: {url}", details=info)
+
+
+class RangeReader(io.RawIOBase):
+    """A seekable, read-only view of a remote file built on Range requests.
+
+    One response is kept open at a time. Reads that carry on from where it
+    has got to continue it and any other read starts a new request. Each
+    request stops at the next of ``boundaries``, so only the bytes that are
+    read are transferred.
+    """
+
+    def __init__(self, module, url: str, report: dict, size: int, tail: bytes):
+        super().__init__()
+        self._module = module
+        self._url = url
+        self._report = report
+        self.size = size
+        self._tail = tail
+        self._tail_offset = size - len(tail)
+        self._pos = 0
+        self._response = None
+        self._response_pos = 0
+        self._response_end = 0
+        self.boundaries = []
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        size = max(min(len(buffer), self.size - self._pos), 0)
+        # zipfile takes a short read for a truncated archive, so carry on
+        # across requests and into the tail until the buffer is full
+        filled = 0
+        while filled < size:
+            if self._pos >= self._tail_offset:
+                start = self._pos - self._tail_offset
+                data = self._tail[start : start + size - filled]
+            else:
+                data = self._read_remote(
+                    min(size - filled, self._tail_offset - self._pos)
+                )
+            buffer[filled : filled + len(data)] = data
+            filled += len(data)
+            self._pos += len(data)
+        return filled
+
+    def _read_remote(self, size: int) -> bytes:
+        with metrics.phase("download"):
+            if self._response is None or not (
+                self._response_pos == self._pos < self._response_end
+            ):
+                self._request()
+            data = self._response.read(min(size, self._response_end - self._pos))
+        metrics.count("bytes_transferred", len(data))
+        if not data:
+            raise SoftwareException(
+                f"Failed to download file: {self._url}", offset=self._pos
+            )
+        self._response_pos += len(data)
+        return data
+
+    def _request(self) -> None:
+        self._close_response()
+        end = min([b for b in self.boundaries if b > self._pos] + [self._tail_offset])
+        response, info = retry.fetch(
+            self._module,
+            self._url,
+            self._report,
+            headers={"Range": f"bytes={self._pos}-{end - 1}"},
+        )
+        if info["status"] != 206:
+            raise SoftwareException(
+                f"Failed to download file: {self._url}", details=info
+            )
+        self._response = response
+        self._response_pos = self._pos
+        self._response_end = end
+
+    def _close_response(self) -> None:
+        if self._response is not None:
+            self._response.close()
+            self._response = None
 
-        member = tf.getmember(filename)
-        filedata = tf.extractfile(member)
-        dest.write_target(filedata.read(), version, file_args)
-        dest.relink(version)
-    return True, {"dest": str(dest), "version": version}
+    def close(self) -> None:
+        self._close_response()
+        super().close()
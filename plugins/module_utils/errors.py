@@ -6,6 +6,10 @@ class SoftwareException(Exception):
         self.context = _sanitize(context)
 
 
+class ChecksumMismatch(SoftwareException):
+    pass
+
+
 def _sanitize(data: dict) -> dict:
     for key, value in data.items():
         if isinstance(value, Path):
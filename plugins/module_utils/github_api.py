@@ -0,0 +1,212 @@
+import json
+import time
+from typing import Dict, Iterable, List, Optional
+
+from . import cache
+from . import download
+from . import retry
+from .errors import SoftwareException
+from .resolvers import GithubVersionResolver
+
+# Enough for the asset lists of all but the most unusual releases
+ASSETS_PER_RELEASE = 100
+
+RELEASE_FIELDS = """
+    latestRelease {
+      tagName
+      releaseAssets(first: %d) { nodes { name downloadUrl } }
+    }
+""" % ASSETS_PER_RELEASE
+
+
+class GithubApiClient:
+    """A small client for the GitHub REST and GraphQL APIs.
+
+    GraphQL is used when a token is available, which lets the latest
+    releases of many projects be fetched in one request. Without a token the
+    REST API is used, one request per project. Rate limit headers are
+    tracked and, when the limit is exhausted, the client waits for the reset
+    if it is within the retry policy's ``max_delay`` and fails otherwise.
+    """
+
+    def __init__(self, module, report: Optional[dict] = None) -> None:
+        self._module = module
+        self.report = report if report is not None else {}
+        self.api_url = module.params["github_api_url"].rstrip("/")
+        self.token = module.params.get("github_token")
+
+    @property
+    def graphql_url(self) -> str:
+        # GitHub Enterprise serves REST under /api/v3 and GraphQL at /api/graphql
+        base = self.api_url
+        if base.endswith("/v3"):
+            base = base[: -len("/v3")]
+        return f"{base}/graphql"
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def _request(self, url: str, **kwargs):
+        for _ in range(2):
+            response, info = retry.fetch(
+                self._module, url, self.report, headers=self._headers(), **kwargs
+            )
+            remaining = info.get("x-ratelimit-remaining")
+            if remaining is not None:
+                self.report["rate_limit_remaining"] = int(remaining)
+            if info["status"] not in (403, 429) or remaining != "0":
+                return response, info
+
+            wait = int(info.get("x-ratelimit-reset", 0)) - time.time()
+            policy = retry.RetryPolicy.from_params(self._module.params)
+            if wait > policy.max_delay:
+                break
+            time.sleep(max(wait, 0))
+
+        raise SoftwareException(
+            "GitHub API rate limit exceeded",
+            reset=info.get("x-ratelimit-reset"),
+            url=url,
+        )
+
+    def latest_releases(self, projects: Iterable[str]) -> Dict[str, dict]:
+        """Return ``{project: {"version": tag, "assets": {name: url}}}``."""
+        projects = list(dict.fromkeys(projects))
+        if not projects:
+            return {}
+        if self.token:
+            return self._graphql_latest(projects)
+        return {project: self._rest_latest(project) for project in projects}
+
+    def _rest_latest(self, project: str) -> dict:
+        url = f"{self.api_url}/repos/{project}/releases/latest"
+        response, info = self._request(url)
+        if info["status"] != 200:
+            raise SoftwareException(
+                "Failed to determine latest version", project=project, details=info
+            )
+        release = json.loads(response.read())
+        return {
+            "version": release["tag_name"],
+            "assets": {
+                asset["name"]: asset["browser_download_url"]
+                for asset in release.get("assets", [])
+            },
+        }
+
+    def _graphql_latest(self, projects: List[str]) -> Dict[str, dict]:
+        declarations = []
+        selections = []
+        variables = {}
+        for i, project in enumerate(projects):
+            owner, _, name = project.partition("/")
+            variables[f"o{i}"] = owner
+            variables[f"n{i}"] = name
+            declarations.append(f"$o{i}: String!, $n{i}: String!")
+            selections.append(
+                f"r{i}: repository(owner: $o{i}, name: $n{i}) {{{RELEASE_FIELDS}}}"
+            )
+        query = "query(%s) {\n%s\n}" % (", ".join(declarations), "\n".join(selections))
+
+        response, info = self._request(
+            self.graphql_url,
+            method="POST",
+            data=json.dumps({"query": query, "variables": variables}),
+        )
+        if info["status"] != 200:
+            raise SoftwareException("GitHub GraphQL request failed", details=info)
+        body = json.loads(response.read())
+        if body.get("errors"):
+            raise SoftwareException(
+                "GitHub GraphQL request failed", errors=body["errors"]
+            )
+
+        releases = {}
+        for i, project in enumerate(projects):
+            repository = body["data"].get(f"r{i}") or {}
+            release = repository.get("latestRelease")
+            if not release:
+                raise SoftwareException("No release found", project=project)
+            releases[project] = {
+                "version": release["tagName"],
+                "assets": {
+                    asset["name"]: asset["downloadUrl"]
+                    for asset in release["releaseAssets"]["nodes"]
+                },
+            }
+        return releases
+
+
+class GithubApiResolver(GithubVersionResolver):
+    """Resolves GitHub releases through the API instead of redirects.
+
+    The latest release of the project, including its asset URLs, is looked
+    up once and reused for the download. ``prefetch`` fills that in for many
+    resolvers with a single GraphQL query.
+    """
+
+    def __init__(self, module) -> None:
+        super().__init__(module)
+        self.release = None
+
+    @property
+    def project(self) -> str:
+        return self._module.params["github_args"]["project"]
+
+    def get_latest(self) -> str:
+        client = GithubApiClient(self._module, self.report)
+        url = f"{client.api_url}/repos/{self.project}/releases/latest"
+        return cache.latest_version(self._module.params, url, self._fetch_release)
+
+    def _fetch_release(self) -> str:
+        if self.release is None:
+            client = GithubApiClient(self._module, self.report)
+            self.release = client.latest_releases([self.project])[self.project]
+        return self.release["version"]
+
+    def _asset_url(self, version: str) -> Optional[str]:
+        if not self.release or self.release["version"] != version:
+            return None
+        url_filename = self._url_filename(version)
+        if url_filename not in self.release["assets"]:
+            raise SoftwareException(
+                "Release asset not found",
+                project=self.project,
+                version=version,
+                asset=url_filename,
+            )
+        return self.release["assets"][url_filename]
+
+    def download_url(self, version) -> str:
+        return self._asset_url(version) or super().download_url(version)
+
+    def download(self, version, conditional=False):
+        url = self._asset_url(version)
+        if url is None:
+            return super().download(version, conditional=conditional)
+        return download.stream(
+            self._module, version, self.report, conditional=conditional, url=url
+        )
+
+
+def prefetch(resolvers: List[GithubApiResolver]) -> None:
+    """Resolve the latest release of every resolver's project at once.
+
+    Resolvers are grouped by API endpoint and token so each group costs a
+    single request.
+    """
+    groups = {}
+    for resolver in resolvers:
+        params = resolver._module.params
+        key = (params["github_api_url"], params.get("github_token"))
+        groups.setdefault(key, []).append(resolver)
+
+    for group in groups.values():
+        client = GithubApiClient(group[0]._module)
+        releases = client.latest_releases(r.project for r in group)
+        for resolver in group:
+            resolver.release = releases[resolver.project]
+            resolver.report.update(client.report)
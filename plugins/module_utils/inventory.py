@@ -0,0 +1,53 @@
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+from .manifest import MANIFEST_NAME, Manifest
+
+
+def scan(directory: Path) -> Dict[str, Dict[str, Any]]:
+    """Find the releases installed in ``directory``.
+
+    Releases recorded in the directory's manifest are reported from it.
+    Anything else is recognized by its ``name -> name-<version>`` link, so
+    installs from before the manifest existed are found too. The directory
+    is listed once and only links are read; targets are never opened.
+    """
+    directory = Path(directory).expanduser()
+    found = {}
+    owned = set()
+
+    if (directory / MANIFEST_NAME).exists():
+        for name, entry in Manifest(directory).entries.items():
+            found[name] = {
+                "version": entry["version"],
+                "checksum": entry.get("checksum"),
+                "url": entry.get("url"),
+                "installed_at": entry.get("installed_at"),
+                "files": {
+                    str(directory / link): recorded["target"]
+                    for link, recorded in entry["files"].items()
+                },
+                "source": "manifest",
+            }
+            owned.update(entry["files"])
+
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return found
+
+    for entry in entries:
+        if entry.name in owned or not entry.is_symlink():
+            continue
+        link = os.readlink(entry.path)
+        prefix = f"{Path(entry.name).stem}-"
+        target_dir, target_name = os.path.split(link)
+        if not target_name.startswith(prefix) or target_dir not in ("", str(directory)):
+            continue
+        found[entry.name] = {
+            "version": target_name[len(prefix) :],
+            "files": {entry.path: link},
+            "source": "link",
+        }
+    return found
@@ -9,11 +9,20 @@ def run(sr, module):
     if not dest.is_dir():
         raise SoftwareException("dest must be a directory", path=dest)
 
+    if module.check_mode:
+        return download.plan(sr.resolver, module, dest, sr.name, sr.version)
+
     if module.params["release_type"] == "executable":
         changed, meta = download.executable(
             sr.resolver, sr.name, module, dest, sr.version
         )
+    elif module.params["release_type"] == "compressed_executable":
+        changed, meta = download.compressed_executable(
+            sr.resolver, sr.name, module, dest, sr.version
+        )
     elif module.params["release_type"] == "tarball":
         changed, meta = download.tarball(sr.resolver, module, dest, sr.version)
+    elif module.params["release_type"] == "zip":
+        changed, meta = download.zip_archive(sr.resolver, module, dest, sr.version)
 
     return changed, meta
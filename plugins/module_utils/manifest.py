@@ -0,0 +1,109 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+MANIFEST_NAME = ".software.json"
+
+
+class Manifest:
+    """The releases installed in one ``dest`` directory.
+
+    Each managed name maps to the installed version, its checksum, the URL
+    it came from, when it was installed and the links it owns along with
+    their targets' size and mtime. That is enough to confirm an install with
+    one read and a ``stat`` per file, and tells ``absent`` exactly which
+    files to remove.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory).expanduser()
+        self.path = self.directory / MANIFEST_NAME
+        try:
+            self.entries = json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.entries.get(name)
+
+    def installed(self, name: str, version: str, checksum: Optional[str] = None) -> bool:
+        """Whether ``version`` of ``name`` is installed and unchanged."""
+        entry = self.get(name)
+        if not entry or entry["version"] != version:
+            return False
+        if checksum and entry.get("checksum") != checksum:
+            return False
+        for link, recorded in entry["files"].items():
+            try:
+                st = os.stat(self.directory / link)
+                target = os.readlink(self.directory / link)
+            except OSError:
+                # Missing, or replaced by something that is not a link; the
+                # slower checks report which
+                return False
+            if not (
+                target == recorded["target"]
+                and st.st_size == recorded["size"]
+                and st.st_mtime_ns == recorded["mtime_ns"]
+            ):
+                return False
+        return True
+
+    @contextmanager
+    def _updating(self):
+        """Reload, update and atomically rewrite the manifest under a lock.
+
+        Releases installed concurrently into the same directory each hold
+        the lock only while their own entry is written.
+        """
+        with open(self.directory / f"{MANIFEST_NAME}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.__init__(self.directory)
+                yield self.entries
+                tmp = self.path.with_name(f".{uuid.uuid4().hex}")
+                tmp.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+                tmp.replace(self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def record(
+        self,
+        name: str,
+        version: str,
+        versioned_paths: Iterable,
+        url: Optional[str] = None,
+        checksum: Optional[str] = None,
+    ) -> None:
+        files = {}
+        for vp in versioned_paths:
+            target = vp.target_path(version)
+            st = target.stat()
+            files[vp.path.name] = {
+                "target": str(target),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+            }
+
+        with self._updating() as entries:
+            previous = entries.get(name, {})
+            if checksum is None and previous.get("version") == version:
+                checksum = previous.get("checksum")
+            entries[name] = {
+                "version": version,
+                "checksum": checksum,
+                "url": url,
+                "installed_at": int(time.time()),
+                "files": files,
+            }
+
+    def forget(self, name: str) -> None:
+        if name not in self.entries:
+            return
+        with self._updating() as entries:
+            entries.pop(name, None)
@@ -0,0 +1,160 @@
+import contextlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+COUNTERS = ("bytes_transferred", "bytes_written", "requests", "cache_hits")
+
+# How many functions a profile lists
+PROFILE_LIMIT = 25
+
+# The collector of the run on this thread; helpers are no-ops without one
+_local = threading.local()
+
+
+class Collector:
+    """Measures one module run for the ``metrics`` and ``profile`` options.
+
+    Wall time is kept per phase. Phases nest and time spent in an inner
+    phase is not counted in the outer one, so reading a download while
+    writing it is counted as ``download`` and the rest as ``write``. Time
+    outside every phase is only part of ``total``.
+    """
+
+    def __init__(self, metrics: bool = False, profile: bool = False) -> None:
+        self.metrics = metrics
+        self.profile = profile
+        self.phases: Dict[str, float] = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.total = 0.0
+        self._stack: List[str] = []
+        self._mark = 0.0
+        self._lock = threading.Lock()
+        self._profiler = None
+
+    @classmethod
+    def from_params(cls, params) -> "Collector":
+        return cls(params.get("metrics", False), params.get("profile", False))
+
+    def __enter__(self) -> "Collector":
+        if self.metrics:
+            _local.collector = self
+        if self.profile:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.total = time.perf_counter() - self._start
+        if self._profiler:
+            self._profiler.disable()
+        if self.metrics:
+            _local.collector = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        self._charge(time.perf_counter())
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self._stack.pop()
+
+    def _charge(self, now: float) -> None:
+        if self._stack:
+            name = self._stack[-1]
+            self.phases[name] = self.phases.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    def count(self, name: str, n: int = 1) -> None:
+        # Counters may be updated from download threads
+        with self._lock:
+            self.counters[name] += n
+
+    def result(self) -> Dict[str, Any]:
+        """The ``metrics`` and ``profile`` results that were asked for."""
+        result = {}
+        if self.metrics:
+            result["metrics"] = dict(
+                self.counters,
+                total=round(self.total, 6),
+                phases={name: round(t, 6) for name, t in self.phases.items()},
+            )
+        if self._profiler:
+            result["profile"] = top(self._profiler, PROFILE_LIMIT)
+        return result
+
+
+def top(profiler, limit: int) -> List[Dict[str, Any]]:
+    """The ``limit`` functions with the most cumulative time."""
+    import pstats
+
+    stats = pstats.Stats(profiler).sort_stats("cumulative")
+    functions = []
+    for func in stats.fcn_list[:limit]:
+        filename, line, name = func
+        _, calls, own, cumulative, _ = stats.stats[func]
+        functions.append(
+            {
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "tottime": round(own, 6),
+                "cumtime": round(cumulative, 6),
+            }
+        )
+    return functions
+
+
+def current() -> Optional[Collector]:
+    return getattr(_local, "collector", None)
+
+
+def phase(name: str):
+    """Count the time in this context as ``name``, when collecting."""
+    collector = current()
+    return collector.phase(name) if collector else contextlib.nullcontext()
+
+
+def count(name: str, n: int = 1) -> None:
+    collector = current()
+    if collector:
+        collector.count(name, n)
+
+
+class MeteredReader:
+    """A stream whose reads are timed as ``download``.
+
+    With a ``counter`` the bytes read are added to it too.
+    """
+
+    def __init__(self, raw, counter: Optional[str] = None) -> None:
+        self._raw = raw
+        self._counter = counter
+
+    def read(self, size: int = -1) -> bytes:
+        with phase("download"):
+            data = self._raw.read(size)
+        if self._counter:
+            count(self._counter, len(data))
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def reader(raw, counter: Optional[str] = None):
+    """Meter ``raw`` when collecting, otherwise return it unchanged."""
+    if raw is None or current() is None:
+        return raw
+    return MeteredReader(raw, counter)
@@ -0,0 +1,97 @@
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import retry
+
+# Mirrors that take longer than this to accept a connection are skipped
+PROBE_TIMEOUT = 1.0
+
+# Probe results are shared by every release handled in one module run
+_latencies: Dict[Tuple[str, int], Optional[float]] = {}
+_lock = threading.Lock()
+
+
+def _address(url: str) -> Tuple[str, int]:
+    parts = urlsplit(url)
+    return parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+
+
+def _probe(address: Tuple[str, int]) -> Optional[float]:
+    """Seconds taken to open a TCP connection, or None if it failed."""
+    start = time.monotonic()
+    try:
+        socket.create_connection(address, timeout=PROBE_TIMEOUT).close()
+    except OSError:
+        return None
+    return time.monotonic() - start
+
+
+def latencies(addresses) -> Dict[Tuple[str, int], Optional[float]]:
+    """Probe each address once per run, concurrently."""
+    with _lock:
+        missing = [a for a in set(addresses) if a not in _latencies]
+    if missing:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            results = dict(zip(missing, pool.map(_probe, missing)))
+        with _lock:
+            _latencies.update(results)
+    with _lock:
+        return {a: _latencies[a] for a in addresses}
+
+
+def candidates(module, url: str, context: Optional[dict] = None) -> List[Tuple[Optional[str], str]]:
+    """The URLs to try for ``url``, as ``(mirror, url)`` pairs.
+
+    A mirror is either a URL prefix, which replaces the scheme and host of
+    ``url``, or a template rendered like ``download_url_template`` from
+    ``context``. Templates only apply where a context is given, that is to
+    downloads. Reachable mirrors come first, fastest to connect first, and
+    the origin, with a mirror of ``None``, always comes last.
+    """
+    mirrors = module.params.get("mirrors") or []
+    urls = []
+    for mirror in mirrors:
+        if "{" in mirror:
+            if context is None:
+                continue
+            urls.append((mirror, mirror.format(**module.params, **context)))
+        else:
+            parts = urlsplit(url)
+            path = parts.path + (f"?{parts.query}" if parts.query else "")
+            urls.append((mirror, mirror.rstrip("/") + path))
+
+    measured = latencies([_address(u) for _, u in urls])
+    reachable = [
+        (measured[_address(u)], i, (mirror, u))
+        for i, (mirror, u) in enumerate(urls)
+        if measured[_address(u)] is not None
+    ]
+    return [candidate for _, _, candidate in sorted(reachable)] + [(None, url)]
+
+
+def fetch(
+    module,
+    url: str,
+    report: Optional[dict] = None,
+    ok=(200, 206, 304),
+    context: Optional[dict] = None,
+    **kwargs,
+):
+    """Like ``retry.fetch`` but trying each mirror before the origin.
+
+    The first response with a status in ``ok`` is returned, and the mirror
+    that served it is recorded in ``report["mirror"]`` when mirrors are
+    configured. If none succeeds the origin's response is returned.
+    """
+    for mirror, candidate in candidates(module, url, context):
+        response, info = retry.fetch(module, candidate, report, **kwargs)
+        if info["status"] in ok or mirror is None:
+            break
+    if report is not None and module.params.get("mirrors"):
+        report["mirror"] = mirror
+    return response, info
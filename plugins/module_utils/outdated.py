@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import inventory
+from .errors import SoftwareException
+
+
+def installed_version(found: Dict[str, Dict[str, Any]], params) -> Optional[str]:
+    """The version of a tool among the releases ``inventory.scan`` found.
+
+    Tarball releases installed before there was a manifest are only known by
+    the links of their files.
+    """
+    entry = found.get(params["name"].split("=")[0])
+    if entry is None:
+        for file_spec in params["tarball_args"].get("files") or []:
+            entry = found.get(file_spec["dest"])
+            if entry:
+                break
+    return entry["version"] if entry else None
+
+
+def _check_one(module, resolver, found) -> Dict[str, Any]:
+    installed = installed_version(found, module.params)
+    result = {"name": module.params["name"].split("=")[0], "installed": installed}
+    try:
+        latest = resolver.get_latest()
+    except SoftwareException as e:
+        result.update(failed=True, msg=str(e), **e.context)
+        return result
+    result.update(latest=latest, outdated=installed is not None and installed != latest)
+    return result
+
+
+def check_all(items: List[Tuple[Any, Any]], max_workers: int) -> List[Dict[str, Any]]:
+    """Compare each (module, resolver) pair's installed and latest versions.
+
+    Each ``dest`` is scanned once, without reading any targets, and the
+    latest versions are resolved on a bounded thread pool. Nothing is
+    downloaded. Results are returned in the same order as ``items``.
+    """
+    found = {}
+    for module, _ in items:
+        dest = Path(module.params["dest"]).expanduser()
+        if dest not in found:
+            found[dest] = inventory.scan(dest)
+
+    def check(item):
+        module, resolver = item
+        return _check_one(module, resolver, found[Path(module.params["dest"]).expanduser()])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(check, items))
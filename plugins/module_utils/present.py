@@ -1,7 +1,9 @@
 from pathlib import Path
 
+from .manifest import Manifest
 from .versioned_path import VersionedPath
 from .errors import SoftwareException
+from . import checksum
 from . import download
 
 
@@ -10,17 +12,32 @@ def run(sr, module, software, resolver):
     if not dest.is_dir():
         raise SoftwareException("dest must be a directory", path=dest)
 
+    literal = checksum.literal(module.params)
+    installed = Manifest(dest)
+    entry = installed.get(software.name)
+    if entry and installed.installed(
+        software.name, software.version or entry["version"], literal and str(literal)
+    ):
+        return False, {"dest": str(dest), "version": entry["version"]}
+
     vpath = VersionedPath(dest / software.name)
-    if vpath.verify(software.version):
-        module.exit_json(
-            changed=False, meta={"dest": str(dest), "version": software.version}
-        )
+    if vpath.verify(software.version, literal):
+        return False, {"dest": str(dest), "version": vpath.release_version()}
+
+    if module.check_mode:
+        return download.plan(sr.resolver, module, dest, sr.name, sr.version)
 
     if module.params["release_type"] == "executable":
         changed, meta = download.executable(
             sr.resolver, sr.name, module, dest, sr.version
         )
+    elif module.params["release_type"] == "compressed_executable":
+        changed, meta = download.compressed_executable(
+            sr.resolver, sr.name, module, dest, sr.version
+        )
     elif module.params["release_type"] == "tarball":
         changed, meta = download.tarball(sr.resolver, module, dest, sr.version)
+    elif module.params["release_type"] == "zip":
+        changed, meta = download.zip_archive(sr.resolver, module, dest, sr.version)
 
     return changed, meta
@@ -1,7 +1,71 @@
-from typing import Dict
+import re
+from functools import lru_cache
+from typing import Callable, Dict
 
-from ansible.module_utils.basic import AnsibleModule
-import jinja2
+from .errors import SoftwareException
 
-def string(s: str, **kwargs: Dict[str, str]):
-    return jinja2.Template(s).render(**kwargs)
+# Only templates containing these are handed to Jinja2
+_JINJA_MARKERS = ("{{", "{%", "{#")
+
+# {{ name }}, {{ name.attr }} and {{ name['key'] }} are all the built-in
+# formatter understands; anything else needs Jinja2.
+_SIMPLE_EXPRESSION = re.compile(r"{{\s*([^{}]*?)\s*}}")
+_LOOKUP = re.compile(r"""\.(\w+)|\[\s*['"]?([^'"\]]+)['"]?\s*\]""")
+
+
+def string(s: str, **kwargs: Dict[str, str]) -> str:
+    """Render ``s`` as a Jinja2 template.
+
+    Templates are compiled once per process. Strings without any Jinja2
+    syntax are returned as is, so jinja2 is only imported when needed.
+    """
+    if not any(marker in s for marker in _JINJA_MARKERS):
+        return s
+    return _compile(s)(**kwargs)
+
+
+def template(s: str, **kwargs) -> str:
+    """Render new style (Jinja2) and then old style (str.format) syntax."""
+    rendered = string(s, **kwargs)
+    if "{" not in rendered:
+        return rendered
+    # TODO deprecate old style substitution
+    return rendered.format(**kwargs)
+
+
+@lru_cache(maxsize=None)
+def _compile(s: str) -> Callable[..., str]:
+    try:
+        import jinja2
+    except ImportError:
+        return lambda **kwargs: _simple_render(s, kwargs)
+    return jinja2.Template(s).render
+
+
+def _simple_render(s: str, context: dict) -> str:
+    if "{%" in s or "{#" in s:
+        raise SoftwareException("jinja2 is required to render template", template=s)
+    return _SIMPLE_EXPRESSION.sub(lambda m: str(_lookup(m.group(1), context)), s)
+
+
+def _lookup(expression: str, context: dict):
+    name = re.match(r"\w+", expression)
+    if not name:
+        raise SoftwareException(
+            "jinja2 is required to render template", expression=expression
+        )
+    rest = expression[name.end():]
+    if _LOOKUP.sub("", rest).strip():
+        raise SoftwareException(
+            "jinja2 is required to render template", expression=expression
+        )
+    try:
+        value = context[name.group(0)]
+        for match in _LOOKUP.finditer(rest):
+            key = match.group(1) or match.group(2)
+            value = value[key] if isinstance(value, dict) else getattr(value, key)
+    except (KeyError, AttributeError):
+        raise SoftwareException(
+            f"undefined variable {name.group(0)}", expression=expression
+        ) from None
+    return value
@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+from typing import Any, BinaryIO, ContextManager, Optional
+
+from ansible.module_utils.basic import AnsibleModule
+
+from . import cache
+from . import download
+from . import mirrors
+from . import render
+from . import validators
+from .errors import SoftwareException
+
+GITHUB_ARGS_DEFAULT = dict(
+    download_url_template="https://{github_host}/{github_args[project]}/releases/download/{version}/{url_filename}",
+    version_url_template="https://{github_host}/{github_args[project]}/releases/latest",
+    host="github.com",
+    # url_filename_template=None,
+)
+
+
+class GenericResolver:
+    def __init__(self, module: AnsibleModule):
+        self._module = module
+        self.report = {}
+
+    def get_latest(self) -> str:
+        template = self._module.params["version_url_template"]
+        url = template.format(**self._module.params)
+        return cache.latest_version(
+            self._module.params, url, lambda: self._fetch_latest(url)
+        )
+
+    def _fetch_latest(self, url: str) -> str:
+        validator_store = validators.from_params(
+            self._module.params, self._module.check_mode
+        )
+        headers = {}
+        if validator_store and validator_store.body(url) is not None:
+            headers = validator_store.headers(url)
+
+        response, info = mirrors.fetch(self._module, url, self.report, headers=headers)
+        if headers and info["status"] == 304:
+            return validator_store.body(url)
+        if info["status"] != 200:
+            raise SoftwareException("Failed to determine latest version", details=info)
+
+        # Version files usually end with a newline
+        version = response.read().decode("utf8").strip()
+        if validator_store:
+            validator_store.update(url, info, body=version)
+        return version
+
+    def download_url(self, version) -> str:
+        return download.render_url(self._module, version)
+
+    def checksums_url(self, version) -> Optional[str]:
+        return None
+
+    def download(self, version, conditional=False) -> Optional[BinaryIO]:
+        return download.stream(
+            self._module, version, self.report, conditional=conditional
+        )
+
+
+class GithubVersionResolver:
+    def __init__(self, module: AnsibleModule):
+        self._module = module
+        self.report = {}
+
+    def get_latest(self) -> str:
+        template = self._module.params["version_url_template"]
+        url = template.format(**self._module.params)
+        return cache.latest_version(
+            self._module.params, url, lambda: self._fetch_latest(url)
+        )
+
+    def _fetch_latest(self, url: str) -> str:
+        with changed_params(self._module, "follow_redirects", False):
+            _, info = mirrors.fetch(
+                self._module,
+                url,
+                self.report,
+                ok=(301, 302, 303, 307),
+                method="HEAD",
+            )
+        if info["status"] not in (301, 302, 303, 307):
+            raise SoftwareException("Failed to determine latest version")
+
+        return info["location"].split("/")[-1]
+
+    def _render_filename(self, template: str, version: str) -> str:
+        return render.template(template, version=version, **self._module.params)
+
+    def _url_filename(self, version: str) -> str:
+        if "url_filename_template" in self._module.params["github_args"]:
+            url_filename = self._module.params["github_args"]["url_filename_template"]
+        else:
+            # Works for both package and package=1.0
+            url_filename = self._module.params["name"].split("=")[0]
+        return self._render_filename(url_filename, version)
+
+    def download_url(self, version) -> str:
+        return download.render_url(
+            self._module, version, url_filename=self._url_filename(version)
+        )
+
+    def checksums_url(self, version) -> Optional[str]:
+        """URL of the release's checksums asset, if one is configured.
+
+        ``github_args.checksums_filename_template`` names the asset, for
+        example ``checksums.txt`` or ``{url_filename}.sha256``.
+        """
+        template = self._module.params["github_args"].get("checksums_filename_template")
+        if not template:
+            return None
+        filename = self._render_filename(
+            template.replace("{url_filename}", self._url_filename(version)), version
+        )
+        return download.render_url(self._module, version, url_filename=filename)
+
+    def download(self, version, conditional=False) -> Optional[BinaryIO]:
+        return download.stream(
+            self._module,
+            version,
+            self.report,
+            conditional=conditional,
+            url_filename=self._url_filename(version),
+        )
+
+
+@contextmanager
+def changed_params(
+    module: AnsibleModule, key: str, value: Any
+) -> ContextManager[AnsibleModule]:
+    undefined = object()
+
+    old_value = module.params.get(key, undefined)
+    module.params[key] = value
+    try:
+        yield module
+    finally:
+        if old_value is undefined:
+            del module.params[key]
+        else:
+            module.params[key] = old_value
+
+
+class StagedResolver:
+    """Serves a version and artifact that were staged by the controller.
+
+    The action plugins resolve and download a release once on the controller
+    and copy it to each host; this wraps the module's own resolver so that
+    the staged version and file are used instead of the network. Without a
+    file only the version is staged.
+    """
+
+    def __init__(self, resolver, version: str, path: Optional[str]):
+        self._resolver = resolver
+        self._version = version
+        self._path = path
+        self.report = resolver.report
+
+    def get_latest(self) -> str:
+        return self._version
+
+    def download_url(self, version) -> str:
+        return self._resolver.download_url(version)
+
+    def checksums_url(self, version) -> Optional[str]:
+        return self._resolver.checksums_url(version)
+
+    def download(self, version, conditional=False) -> Optional[BinaryIO]:
+        if version != self._version or self._path is None:
+            return self._resolver.download(version, conditional=conditional)
+        self.report["staged"] = True
+        return open(self._path, "rb")
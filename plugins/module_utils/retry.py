@@ -0,0 +1,86 @@
+import random
+import time
+from typing import Optional
+
+from ansible.module_utils.urls import fetch_url
+
+from . import metrics
+
+# fetch_url reports connection failures and timeouts as status -1
+RETRYABLE_STATUS_CODES = (-1, 408, 429, 500, 502, 503, 504)
+
+# Suboptions of the modules' ``retry`` option
+RETRY_SPEC = dict(
+    retries=dict(type="int", default=0),
+    delay=dict(type="float", default=1.0),
+    max_delay=dict(type="float", default=30.0),
+    jitter=dict(type="float", default=0.5),
+    status_codes=dict(
+        type="list", elements="int", default=list(RETRYABLE_STATUS_CODES)
+    ),
+)
+
+
+class RetryPolicy:
+    """How failed HTTP requests are retried.
+
+    The delay before retry ``n`` is ``delay * 2 ** n`` capped at
+    ``max_delay``, then scaled by a random factor in ``[1 - jitter, 1]`` so
+    that many hosts failing together do not retry in lockstep.
+    """
+
+    def __init__(
+        self,
+        retries: int = 0,
+        delay: float = 1.0,
+        max_delay: float = 30.0,
+        jitter: float = 0.5,
+        status_codes=RETRYABLE_STATUS_CODES,
+    ) -> None:
+        self.retries = retries
+        self.delay = delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.status_codes = frozenset(status_codes)
+
+    @classmethod
+    def from_params(cls, params) -> "RetryPolicy":
+        options = params.get("retry")
+        if not options:
+            return cls()
+        return cls(
+            retries=options["retries"],
+            delay=options["delay"],
+            max_delay=options["max_delay"],
+            jitter=options["jitter"],
+            status_codes=options["status_codes"],
+        )
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.delay * 2 ** attempt, self.max_delay)
+        return delay * (1 - random.uniform(0, self.jitter))
+
+
+def fetch(module, url: str, report: Optional[dict] = None, **kwargs):
+    """Call fetch_url, retrying according to the module's retry policy.
+
+    The number of requests made is added to ``info["attempts"]`` and to
+    ``report["attempts"]`` when a report is given. A ``304 Not Modified``
+    counts as a cache hit in the run's metrics.
+    """
+    policy = RetryPolicy.from_params(module.params)
+    attempt = 0
+    while True:
+        response, info = fetch_url(module, url, **kwargs)
+        attempt += 1
+        if attempt > policy.retries or info["status"] not in policy.status_codes:
+            break
+        time.sleep(policy.backoff(attempt - 1))
+
+    info["attempts"] = attempt
+    metrics.count("requests", attempt)
+    if info["status"] == 304:
+        metrics.count("cache_hits")
+    if report is not None:
+        report["attempts"] = report.get("attempts", 0) + attempt
+    return response, info
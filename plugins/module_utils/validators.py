@@ -0,0 +1,68 @@
+import json
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .common import Software
+
+
+class ValidatorStore:
+    """HTTP cache validators (ETag and Last-Modified) recorded per URL.
+
+    The store is a small JSON file kept next to the installed target so that
+    later runs can send conditional requests and treat ``304 Not Modified``
+    as "unchanged". In check mode updates are only kept in memory.
+    """
+
+    def __init__(self, path: Path, check_mode: bool = False) -> None:
+        self.path = path
+        self.check_mode = check_mode
+        try:
+            self._data = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            self._data = {}
+
+    def headers(self, url: str) -> Dict[str, str]:
+        entry = self._data.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def body(self, url: str) -> Optional[str]:
+        return self._data.get(url, {}).get("body")
+
+    def update(self, url: str, info: dict, body: Optional[str] = None) -> None:
+        etag = info.get("etag")
+        last_modified = info.get("last-modified")
+        if not etag and not last_modified:
+            self._data.pop(url, None)
+        else:
+            entry = {"etag": etag, "last_modified": last_modified}
+            if body is not None:
+                entry["body"] = body
+            self._data[url] = entry
+        self.save()
+
+    def save(self) -> None:
+        if self.check_mode:
+            return
+        tmp = self.path.with_name(f".{uuid.uuid4().hex}")
+        tmp.write_text(json.dumps(self._data, indent=2, sort_keys=True))
+        tmp.replace(self.path)
+
+
+def store_path(dest: Union[str, Path], name: str) -> Path:
+    software = Software.from_param(name)
+    return Path(dest).expanduser() / f".{software.name}.validators.json"
+
+
+def from_params(params, check_mode: bool = False) -> Optional[ValidatorStore]:
+    if not params.get("conditional_requests"):
+        return None
+    path = store_path(params["dest"], params["name"])
+    if not path.parent.is_dir():
+        return None
+    return ValidatorStore(path, check_mode)
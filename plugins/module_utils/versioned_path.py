@@ -1,5 +1,16 @@
-from typing import Dict, Optional
+import io
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
+from ansible.module_utils.basic import AnsibleModule
+
+from . import checksum
+from . import metrics
+from .checksum import CHUNK_SIZE
 from .errors import SoftwareException
 
 class EmptyPath:
@@ -24,44 +35,254 @@ class VersionedPath:
             )
         else:
             self.target = EmptyPath()
+        # How the last target was created from an identical one, if it was
+        self.deduplicated = None
 
     def __str__(self):
         return str(self.path)
 
-    def relink(self, version: str, delete_old_target=True):
-        new_target = self.path.parent / f"{self.path.stem}-{version}"
-        if self.target and self.target != new_target and delete_old_target:
-            self.target.resolve().unlink()
+    def target_path(self, version: str):
+        return self.path.parent / f"{self.path.stem}-{version}"
+
+    def digest_path(self, version: str):
+        return self.path.parent / f".{self.path.stem}-{version}.digest"
+
+    def history_path(self):
+        return self.path.parent / f".{self.path.stem}.versions"
+
+    def history(self) -> List[str]:
+        """Versions kept on disk, most recently installed first."""
+        try:
+            versions = json.loads(self.history_path().read_text())
+        except (FileNotFoundError, ValueError):
+            versions = []
+        current = self.release_version()
+        if current and current not in versions:
+            # Installed before the history was kept
+            versions.insert(0, current)
+        return versions
+
+    def relink(self, version: str, keep_versions: int = 0):
+        """Point the link at ``version`` and prune old versions.
+
+        The ``keep_versions`` most recent previous versions are left on disk
+        so that switching back to them needs no download.
+        """
+        history = [version] + [v for v in self.history() if v != version]
 
         self.path.unlink(missing_ok=True)
-        self.path.symlink_to(new_target)
-        self.target = new_target
+        self.path.symlink_to(self.target_path(version))
+        self.target = self.target_path(version)
+
+        for old_version in history[keep_versions + 1 :]:
+            self.target_path(old_version).unlink(missing_ok=True)
+            self.digest_path(old_version).unlink(missing_ok=True)
+        self._write_history(history[: keep_versions + 1])
+
+    def _write_history(self, versions: List[str]) -> None:
+        if len(versions) <= 1:
+            # Nothing but the link target, which needs no record
+            self.history_path().unlink(missing_ok=True)
+            return
+        tmp = self.history_path().with_name(f".{uuid.uuid4().hex}")
+        tmp.write_text(json.dumps(versions))
+        tmp.replace(self.history_path())
+
+    def kept(self, version: str, expected: Optional[checksum.Checksum] = None) -> bool:
+        """Whether ``version`` is still on disk, unchanged since it was written."""
+        target = self.target_path(version)
+        return (
+            checksum.recorded(target, self.digest_path(version)) is not None
+            and self.intact(version, expected)
+        )
+
+    def managed(self) -> bool:
+        """Whether the link looks like one that ``relink`` created.
+
+        Anything else at the path belongs to someone else and is never
+        replaced or removed.
+        """
+        if not self.target:
+            return True
+        link = Path(os.readlink(self.path))
+        return link.name.startswith(f"{self.path.stem}-") and link.parent in (
+            self.path.parent,
+            Path("."),
+        )
 
     def release_version(self):
         if not self.target:
             return None
         return str(self.target)[len(str(self.path)) + 1 :]
 
-    def write_target(self, data: bytes, version, file_args: Dict[str, Optional[str]]):
-        new_target = self.path.parent / f"{self.path.stem}-{version}"
-        new_target.write_bytes(data)
-        if file_args["mode"]:
-            new_target.chmod(file_args["mode"])
-        if file_args["owner"]:
-            new_target.owner(file_args["owner"])
-        if file_args["group"]:
-            new_target.group(file_args["group"])
+    def write_target(
+        self,
+        data: Union[bytes, BinaryIO],
+        version,
+        file_args: Dict[str, Optional[str]],
+        expected: Optional[checksum.Checksum] = None,
+        index=None,
+    ) -> Dict[str, str]:
+        """Write the versioned target from bytes or a readable stream.
+
+        Data is written to a temporary file next to the target and renamed
+        into place so a failed download never leaves a partial target behind.
+        The data is hashed as it is written; if it does not match ``expected``
+        the target is left untouched. The digests are recorded next to the
+        target and returned.
+
+        With a dedupe ``index``, an identical target that is already
+        installed is linked or cloned in place of the written copy.
+        """
+        staged, digests = self.stage(data, version, expected)
+        return self.install(staged, version, file_args, digests, index)
+
+    def stage(
+        self,
+        data: Union[bytes, BinaryIO],
+        version,
+        expected: Optional[checksum.Checksum] = None,
+    ) -> Tuple[Path, Dict[str, str]]:
+        """Write the target for ``version`` to a temporary file beside it.
+
+        Returns the temporary file and its digests, for ``install`` to move
+        into place once whatever it came from has been verified. Nothing is
+        left behind if writing fails or the data does not match ``expected``.
+        """
+        if isinstance(data, bytes):
+            data = io.BytesIO(data)
+        reader = checksum.HashingReader(data, checksum.algorithms(expected))
+
+        new_target = self.target_path(version)
+        tmp_target = self._tmp_path(new_target)
+        try:
+            with metrics.phase("write"), tmp_target.open("xb") as f:
+                shutil.copyfileobj(reader, f, CHUNK_SIZE)
+                metrics.count("bytes_written", f.tell())
+            if expected:
+                expected.verify(reader.digests(), path=str(new_target))
+        except BaseException:
+            tmp_target.unlink(missing_ok=True)
+            raise
+        return tmp_target, reader.digests()
+
+    def install(
+        self,
+        staged: Path,
+        version,
+        file_args: Dict[str, Optional[str]],
+        digests: Dict[str, str],
+        index=None,
+    ) -> Dict[str, str]:
+        """Move a file written by ``stage`` into place as the target."""
+        new_target = self.target_path(version)
+        try:
+            found = index.find(digests, new_target.parent) if index else None
+            if found:
+                staged.unlink()
+                self.deduplicated = index.clone(found[0], staged, file_args)
+            staged.replace(new_target)
+        finally:
+            staged.unlink(missing_ok=True)
+
+        return self._finish(version, file_args, digests, index)
+
+    def link_target(
+        self,
+        source,
+        digests: Dict[str, str],
+        version,
+        file_args: Dict[str, Optional[str]],
+        index,
+    ) -> Dict[str, str]:
+        """Create the versioned target from an identical installed file."""
+        new_target = self.target_path(version)
+        tmp_target = self._tmp_path(new_target)
+        try:
+            self.deduplicated = index.clone(source, tmp_target, file_args)
+            tmp_target.replace(new_target)
+        finally:
+            tmp_target.unlink(missing_ok=True)
+        return self._finish(version, file_args, digests, index)
+
+    def _tmp_path(self, target):
+        return target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}")
+
+    def _finish(self, version, file_args, digests, index=None) -> Dict[str, str]:
+        new_target = self.target_path(version)
+        with metrics.phase("permissions"):
+            if file_args["mode"]:
+                mode = octal_mode(file_args["mode"])
+                if mode is None:
+                    mode = AnsibleModule._symbolic_mode_to_octal(
+                        new_target.stat(), file_args["mode"]
+                    )
+                new_target.chmod(mode)
+            if file_args["owner"]:
+                new_target.owner(file_args["owner"])
+            if file_args["group"]:
+                new_target.group(file_args["group"])
+
+        checksum.record(new_target, self.digest_path(version), digests)
+        if index:
+            index.add(new_target, self.digest_path(version), digests)
+        return digests
+
+    def intact(self, version: str, expected: Optional[checksum.Checksum] = None) -> bool:
+        """Whether the installed target is still what was written.
+
+        The recorded digests are trusted as long as the target's size and
+        mtime have not changed, so this does not read the target. Targets
+        without a record, from before digests were recorded, are only hashed
+        when there is an ``expected`` checksum to compare against.
+        """
+        target = self.target_path(version)
+        record_path = self.digest_path(version)
+        digests = checksum.recorded(target, record_path)
+        if digests is None and record_path.exists():
+            return False
+        if not expected:
+            return True
+        if digests is None or expected.algorithm not in digests:
+            with target.open("rb") as f:
+                reader = checksum.HashingReader(f, checksum.algorithms(expected))
+                reader.drain()
+            digests = reader.digests()
+        return digests.get(expected.algorithm) == expected.digest
 
     def remove(self):
-        if self.target.exists():
-            self.target.unlink()
+        for version in self.history():
+            self.target_path(version).unlink(missing_ok=True)
+            self.digest_path(version).unlink(missing_ok=True)
+        self.history_path().unlink(missing_ok=True)
         if self.path.exists() or self.path.is_symlink():
             self.path.unlink(missing_ok=True)
 
     def exists(self):
         return self.path.exists() or (self.target and self.target.exists())
 
-    def verify(self, expected_version: Optional[str]):
+    def verify(
+        self,
+        expected_version: Optional[str],
+        expected: Optional[checksum.Checksum] = None,
+    ):
         if expected_version and self.release_version() != expected_version:
             return False
-        return self.path.exists() and self.target.exists()
+        return (
+            self.path.exists()
+            and self.target.exists()
+            and self.intact(self.release_version(), expected)
+        )
+
+
+def octal_mode(mode) -> Optional[int]:
+    """``mode`` as a number, or ``None`` for a symbolic mode such as u+rwx.
+
+    Like chmod, Ansible reads a string of digits as an octal number.
+    """
+    if isinstance(mode, str):
+        try:
+            return int(mode, 8)
+        except ValueError:
+            return None
+    return mode
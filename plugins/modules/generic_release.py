@@ -53,16 +53,29 @@ options:
   release_type:
     type: str
     description:
-      - Specifies if the release is an executable or packaged in a tarball.
+      - Specifies if the release is an executable, a compressed executable
+        or packaged in a tarball or zip archive.
+      - C(compressed_executable) is a single executable compressed with gzip,
+        bzip2 or xz, such as C(tool.gz). The format is detected from the
+        artifact's first bytes and it is decompressed while it downloads, so
+        the compressed file is never stored. C(checksum) is that of the
+        compressed artifact.
+      - Tarballs may be compressed with gzip, bzip2 or xz, which is detected
+        the same way.
+      - For C(zip) releases only the archive's index and the wanted files are
+        downloaded when the server supports HTTP C(Range) requests and
+        neither C(checksum) nor C(cache_dir) needs the whole archive.
     default: executable
     choices:
       - executable
+      - compressed_executable
       - tarball
+      - zip
 
   tarball_args:
     type: dict
     description:
-      - Options for dealing with a tarball release.
+      - Options for dealing with a tarball or zip release.
       - C(files) is a list containing a dictionary where C(src) is the path
         in the tarball and C(dest) is the remote path to save the file.
     default: null
@@ -108,7 +121,218 @@ options:
     required: true
     default: null
 
-notes: []
+  cache_dir:
+    type: path
+    description:
+      - Directory on the target host used to cache downloaded artifacts.
+      - Artifacts are stored by digest and keyed by download URL and version,
+        so reinstalling a version or installing it into another C(dest) does not
+        download it again.
+      - Caching is disabled when not set.
+    default: null
+
+  cache_max_size:
+    type: int
+    description:
+      - Maximum size of C(cache_dir) in MiB. The least recently used artifacts
+        are evicted once it is exceeded.
+    default: 1024
+
+  version_cache_ttl:
+    type: int
+    description:
+      - Number of seconds a version resolved from C(version_url_template) is
+        reused before the URL is requested again.
+      - Resolved versions are stored in C(cache_dir), so this has no effect
+        unless C(cache_dir) is set.
+      - C(0) disables the version cache.
+    default: 0
+
+  conditional_requests:
+    type: bool
+    description:
+      - Record the ETag and Last-Modified validators of each URL in a hidden
+        file next to the installed target and send conditional requests on
+        later runs.
+      - A C(304 Not Modified) response is treated as unchanged, so the stored
+        version or the file already on disk is used.
+    default: false
+
+  download_attempts:
+    type: int
+    description:
+      - Number of requests made to download an artifact before giving up.
+      - When greater than C(1), data received before a dropped connection is
+        kept and the download is resumed with an HTTP C(Range) request. The
+        final size is checked against the C(Content-Length) of the response.
+      - Only a download whose C(ETag) or C(Last-Modified) is known is
+        resumed, and it is sent as C(If-Range) so a file that has changed is
+        downloaded again from the start.
+      - When C(cache_dir) is set partial downloads are kept there, so a later
+        run can also resume them.
+    default: 1
+
+  download_chunks:
+    type: int
+    description:
+      - Number of concurrent HTTP C(Range) requests to download an artifact
+        with. Faster than a single stream from rate limited CDNs and over high
+        latency links.
+      - Only artifacts larger than 8MiB are split, and only when the server
+        supports ranges; anything else is downloaded in a single stream.
+      - Each range is retried C(download_attempts) times, resuming from where
+        it got to.
+    default: 1
+
+  retry:
+    type: dict
+    description:
+      - How failed HTTP requests for versions and downloads are retried.
+    default: {}
+    suboptions:
+      retries:
+        type: int
+        description:
+          - Number of retries after the first request.
+        default: 0
+      delay:
+        type: float
+        description:
+          - Delay in seconds before the first retry, doubled for each later
+            one up to C(max_delay).
+        default: 1
+      max_delay:
+        type: float
+        description:
+          - Longest delay in seconds before a retry.
+        default: 30
+      jitter:
+        type: float
+        description:
+          - Fraction of each delay that is randomized.
+        default: 0.5
+      status_codes:
+        type: list
+        elements: int
+        description:
+          - HTTP statuses that are retried. C(-1) stands for connection
+            failures and timeouts.
+        default: [-1, 408, 429, 500, 502, 503, 504]
+
+  checksum:
+    type: str
+    description:
+      - Checksum the downloaded artifact must match, either
+        C(<algorithm>:<digest>) or C(<algorithm>:<url>).
+      - A URL points at a checksums file, such as C(checksums.txt) or
+        C(<file>.sha256), in which the digest for the downloaded file name is
+        looked up. It may contain C({version}).
+      - The artifact is hashed while it downloads. For tarballs and zip
+        archives the checksum applies to the archive.
+      - Digests of installed files are recorded next to them, so later runs
+        confirm an install from the record without reading the file.
+    default: null
+
+  mirrors:
+    type: list
+    elements: str
+    description:
+      - Mirrors to try before the origin for versions, checksums and
+        downloads.
+      - Each mirror is either a URL prefix, such as C(http://mirror.lan/github),
+        which replaces the scheme and host of the origin URL, or a template
+        like C(download_url_template), which only applies to downloads.
+      - Mirrors are probed with a TCP connection once per run. Reachable ones
+        are tried fastest first, and any failure falls back to the next
+        mirror and finally to the origin.
+    default: []
+
+  keep_versions:
+    type: int
+    description:
+      - Number of previously installed versions to keep on disk next to the
+        current one. Older versions are removed.
+      - Installing a version that is still on disk only switches the link
+        back to it, without any requests, so rolling back is instant.
+      - Kept versions are recorded in a hidden C(.<name>.versions) file in
+        C(dest) and are removed along with the link by C(state=absent).
+    default: 0
+
+  dedupe:
+    type: str
+    description:
+      - Share data between identical installed files instead of writing
+        another copy.
+      - Installed files are indexed by digest in C(cache_dir), or
+        C(~/.cache/dstanek.software) when it is not set. When a file with the
+        same digest is already installed on the same filesystem, the new
+        versioned target is created from it. If C(checksum) is known up front
+        the download is skipped entirely.
+      - C(hardlink) links the new target to the existing file when their
+        permissions would be the same, and otherwise behaves like C(reflink).
+      - C(reflink) clones the data with C(FICLONE) or C(copy_file_range) on
+        filesystems that support it, and copies it otherwise.
+    default: none
+    choices:
+      - none
+      - hardlink
+      - reflink
+
+  metrics:
+    type: bool
+    description:
+      - Return C(metrics) with the wall time of each phase of the run and
+        counts of bytes transferred and written, HTTP requests and cache hits.
+    default: false
+
+  profile:
+    type: bool
+    description:
+      - Profile the module with C(cProfile) and return the functions with the
+        most cumulative time as C(profile).
+      - Profiling slows the module down noticeably; use it to find out where
+        a slow task spends its time.
+    default: false
+
+  download_on_controller:
+    type: bool
+    description:
+      - Resolve the version and download the artifact once on the controller
+        and copy it to each host, instead of every host downloading it from
+        upstream.
+      - Resolved versions are cached on the controller for
+        C(version_cache_ttl) seconds, or five minutes if that is C(0), so the
+        version is also only resolved once per run.
+      - Options such as C(cache_dir) still apply to the target host.
+    default: false
+
+  controller_cache_dir:
+    type: path
+    description:
+      - Directory on the controller used to stage artifacts when
+        C(download_on_controller) is set.
+    default: "~/.cache/dstanek.software"
+
+  staged_artifact:
+    type: path
+    description:
+      - Path of an artifact already copied to the host.
+      - Set by the action plugin when C(download_on_controller) is used; not
+        meant to be set directly.
+    default: null
+
+  staged_version:
+    type: str
+    description:
+      - Version resolved on the controller, and of C(staged_artifact) when
+        that is set.
+      - Set by the action plugin when C(download_on_controller) is used; not
+        meant to be set directly.
+    default: null
+
+notes:
+  - Supports check mode and diff mode. In check mode only the requests needed
+    to resolve the version are made; nothing is downloaded.
 requirements: []
 """
 
@@ -140,21 +364,108 @@ version:
   type: str
   returned: always
   sample: 0.5.4
+cached:
+  description: Whether the artifact was served from C(cache_dir)
+  type: bool
+  returned: when C(cache_dir) is set and an artifact was needed
+  sample: true
+checksum:
+  description: Checksum of the downloaded artifact
+  type: str
+  returned: when an artifact was downloaded
+  sample: sha256:2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824
+attempts:
+  description: Number of HTTP requests made, including retries
+  type: int
+  returned: when a request was made
+  sample: 2
+staged:
+  description: Whether the artifact was staged by the controller
+  type: bool
+  returned: when C(download_on_controller) is set and an artifact was needed
+  sample: true
+ranged:
+  description: Whether only parts of a zip archive were downloaded
+  type: bool
+  returned: when a C(zip) release was read with HTTP C(Range) requests
+  sample: true
+deduplicated:
+  description: How the installed file was created from an identical one
+  type: str
+  returned: when C(dedupe) is set and an identical file was already installed
+  sample: hardlink
+old_version:
+  description: Version the files would move from
+  type: str
+  returned: in check mode when something would change
+  sample: v1.0
+files:
+  description: Links that would be changed
+  type: list
+  elements: str
+  returned: in check mode when something would change
+  sample: [/usr/local/bin/kind]
+chunks:
+  description: Number of concurrent range requests the artifact was downloaded with
+  type: int
+  returned: when C(download_chunks) is greater than C(1) and the server supports ranges
+  sample: 4
+compression:
+  description: Format a C(compressed_executable) release was compressed with
+  type: str
+  returned: when a C(compressed_executable) release was downloaded
+  sample: xz
+mirror:
+  description: The mirror that served the last request, or null for the origin
+  type: str
+  returned: when C(mirrors) is set and a request was made
+  sample: http://mirror.lan/github
+metrics:
+  description:
+    - Measurements of the run.
+    - C(phases) has the wall time in seconds spent resolving the version
+      (C(resolve)), fetching checksums (C(checksum)), downloading
+      (C(download)), extracting archives (C(extract)), writing files
+      (C(write)) and setting their permissions (C(permissions)). Time spent
+      reading a download while writing it counts as C(download). C(total) is
+      the wall time of the whole run.
+    - C(bytes_transferred) counts artifact bytes received and C(bytes_written)
+      bytes written to installed files. C(cache_hits) counts versions and
+      artifacts served from C(cache_dir) and C(304 Not Modified) responses.
+  type: dict
+  returned: when C(metrics) is set
+  sample:
+    phases: {resolve: 0.081, download: 1.912, write: 0.044, permissions: 0.0002}
+    total: 2.095
+    bytes_transferred: 58720256
+    bytes_written: 58720256
+    requests: 2
+    cache_hits: 0
+profile:
+  description: The functions with the most cumulative time, most first
+  type: list
+  elements: dict
+  returned: when C(profile) is set
+  sample:
+    - {function: "download.py:31(stream)", calls: 1, tottime: 0.00002, cumtime: 1.9}
 """
 
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import fetch_url
 
 from ansible_collections.dstanek.software.plugins.module_utils import absent
-from ansible_collections.dstanek.software.plugins.module_utils import download
 from ansible_collections.dstanek.software.plugins.module_utils import latest
+from ansible_collections.dstanek.software.plugins.module_utils import metrics
 from ansible_collections.dstanek.software.plugins.module_utils import present
+from ansible_collections.dstanek.software.plugins.module_utils import retry
 from ansible_collections.dstanek.software.plugins.module_utils.common import (
     Software, SoftwareRequest,
 )
 from ansible_collections.dstanek.software.plugins.module_utils.errors import (
     SoftwareException,
 )
+from ansible_collections.dstanek.software.plugins.module_utils.resolvers import (
+    GenericResolver, StagedResolver,
+)
 
 
 MODULE_SPEC = dict(
@@ -165,7 +476,7 @@ MODULE_SPEC = dict(
     group=dict(type="str"),
     release_type=dict(
         type="str",
-        choices=["executable", "tarball"],
+        choices=["executable", "compressed_executable", "tarball", "zip"],
         default="executable",
     ),
     tarball_args=dict(type="dict", default={}),
@@ -181,55 +492,65 @@ MODULE_SPEC = dict(
     ),
     version_url_template=dict(type="str"),
     download_url_template=dict(type="str", required=True),
+    cache_dir=dict(type="path"),
+    cache_max_size=dict(type="int", default=1024),
+    version_cache_ttl=dict(type="int", default=0),
+    conditional_requests=dict(type="bool", default=False),
+    download_attempts=dict(type="int", default=1),
+    download_chunks=dict(type="int", default=1),
+    retry=dict(type="dict", default={}, options=retry.RETRY_SPEC),
+    checksum=dict(type="str"),
+    mirrors=dict(type="list", elements="str", default=[]),
+    keep_versions=dict(type="int", default=0),
+    dedupe=dict(type="str", choices=["none", "hardlink", "reflink"], default="none"),
+    metrics=dict(type="bool", default=False),
+    profile=dict(type="bool", default=False),
+    download_on_controller=dict(type="bool", default=False),
+    controller_cache_dir=dict(type="path", default="~/.cache/dstanek.software"),
+    staged_artifact=dict(type="path"),
+    staged_version=dict(type="str"),
 )
 
 
-class GenericResolver:
-    def __init__(self, module: AnsibleModule):
-        self._module = module
-
-    def get_latest(self) -> str:
-        template = self._module.params["version_url_template"]
-        url = template.format(**self._module.params)
-        response, _ = fetch_url(self._module, url)
-        return response.read().decode("utf8")
-
-    def download(self, version) -> bytes:
-        return download.slurp(self._module, version)
-
-
 def main():
-    module = AnsibleModule(argument_spec=MODULE_SPEC)
+    module = AnsibleModule(argument_spec=MODULE_SPEC, supports_check_mode=True)
     resolver = GenericResolver(module)
+    if module.params["staged_version"]:
+        resolver = StagedResolver(
+            resolver, module.params["staged_version"], module.params["staged_artifact"]
+        )
 
+    collector = metrics.Collector.from_params(module.params)
     try:
-        # Maybe we want to uninstall something?
-        if module.params["state"] == "absent":
-            changed, context = absent.run(module.params)
+        with collector:
+            # Maybe we want to uninstall something?
+            if module.params["state"] == "absent":
+                changed, context = absent.run(module.params, module.check_mode)
 
-        # Maybe we just want to see if *any* version is installed
-        elif module.params["state"] == "present":
-            sr = SoftwareRequest(module.params, resolver)
-            software = Software.from_param(module.params["name"])
-            changed, context = present.run(sr, module, software, resolver)
+            # Maybe we just want to see if *any* version is installed
+            elif module.params["state"] == "present":
+                sr = SoftwareRequest(module.params, resolver)
+                software = Software.from_param(module.params["name"])
+                changed, context = present.run(sr, module, software, resolver)
 
-        # Let's install the latest version
-        elif module.params["state"] == "latest":
-            sr = SoftwareRequest(module.params, resolver)
-            changed, context = latest.run(sr, module)
+            # Let's install the latest version
+            elif module.params["state"] == "latest":
+                sr = SoftwareRequest(module.params, resolver)
+                changed, context = latest.run(sr, module)
 
-        else:
-            raise Exception("what here?")  # TODO: do something here...
+            else:
+                raise Exception("what here?")  # TODO: do something here...
 
-        module.exit_json(changed=changed, **context)
+        module.exit_json(changed=changed, **context, **collector.result())
 
     except SoftwareException as e:
-        module.fail_json(str(e), **e.context)
+        module.fail_json(str(e), **e.context, **collector.result())
     except PermissionError as e:
         module.fail_json(
             e.strerror,
             errno=e.errno,
             path=e.filename,
+            **collector.result(),
         )
 
     module.exit_json(changed=changed, **context)
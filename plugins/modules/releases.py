@@ -0,0 +1,285 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r"""
+---
+module: dstanek.software.releases
+short_description: Download many software releases at once
+description:
+  - Installs a list of releases in a single module invocation.
+  - Each item accepts the same options as M(dstanek.software.generic_release)
+    or M(dstanek.software.github_release).
+  - Items are resolved and downloaded concurrently on a bounded thread pool.
+author: "David Stanek (@dstanek)"
+options:
+  releases:
+    type: list
+    elements: dict
+    description:
+      - The releases to manage.
+      - C(source) selects the resolver used for an item. It defaults to
+        C(github) when C(github_args) is given and C(generic) otherwise.
+      - Options that are not set on an item are taken from the options of the
+        same name on this module.
+    required: true
+
+  max_workers:
+    type: int
+    description:
+      - Maximum number of releases processed at the same time.
+    default: 4
+
+  dest:
+    type: path
+    description:
+      - Default remote directory where files should be copied to.
+    default: "/usr/local/bin"
+
+  mode:
+    type: raw
+    description:
+      - Default permissions of the destination files.
+    default: "755"
+
+  owner:
+    type: str
+    description:
+      - Default name of the user that should own the destination files.
+    default: null
+
+  group:
+    type: str
+    description:
+      - Default name of the group that should own the destination files.
+    default: null
+
+  state:
+    type: str
+    description:
+      - Default state of each release.
+    default: latest
+    choices:
+      - latest
+      - present
+      - absent
+
+  cache_dir:
+    type: path
+    description:
+      - Default directory used to cache downloaded artifacts and versions.
+    default: null
+
+  cache_max_size:
+    type: int
+    description:
+      - Default maximum size of C(cache_dir) in MiB.
+    default: 1024
+
+  version_cache_ttl:
+    type: int
+    description:
+      - Default number of seconds a resolved latest version is reused.
+    default: 0
+
+  conditional_requests:
+    type: bool
+    description:
+      - Default for sending conditional requests using recorded validators.
+    default: false
+
+  download_attempts:
+    type: int
+    description:
+      - Default number of requests made to download an artifact, resuming
+        partial downloads with HTTP C(Range) requests.
+    default: 1
+
+  download_chunks:
+    type: int
+    description:
+      - Default number of concurrent HTTP C(Range) requests large artifacts
+        are downloaded with.
+    default: 1
+
+  retry:
+    type: dict
+    description:
+      - Default retry policy for HTTP requests. See
+        M(dstanek.software.generic_release) for its suboptions.
+    default: {}
+
+  mirrors:
+    type: list
+    elements: str
+    description:
+      - Default mirrors to try before the origin. See
+        M(dstanek.software.generic_release).
+    default: []
+
+  keep_versions:
+    type: int
+    description:
+      - Default number of previously installed versions kept on disk for
+        rolling back without a download.
+    default: 0
+
+  dedupe:
+    type: str
+    description:
+      - Default for sharing data between identical installed files. See
+        M(dstanek.software.generic_release).
+    default: none
+    choices:
+      - none
+      - hardlink
+      - reflink
+
+  github_api:
+    type: bool
+    description:
+      - Default for resolving GitHub releases through the GitHub API.
+      - The latest releases of all such items that share C(github_api_url)
+        and C(github_token) are looked up together, in a single GraphQL
+        request when a token is available.
+    default: false
+
+  github_api_url:
+    type: str
+    description:
+      - Default base URL of the GitHub REST API.
+    default: "https://api.github.com"
+
+  github_token:
+    type: str
+    description:
+      - Default token used to authenticate with the GitHub API.
+      - Defaults to the C(GITHUB_TOKEN) environment variable.
+    default: null
+
+notes:
+  - Supports check mode and diff mode. In check mode only the requests needed
+    to resolve the version are made; nothing is downloaded.
+requirements: []
+"""
+
+EXAMPLES = r"""
+- name: Install the Kubernetes tool belt
+  dstanek.software.releases:
+    dest: ~/.local/bin
+    releases:
+      - name: kubectl
+        version_url_template: https://dl.k8s.io/release/stable.txt
+        download_url_template: https://dl.k8s.io/release/{version}/bin/linux/amd64/kubectl
+      - name: kind
+        github_args:
+          project: kubernetes-sigs/kind
+          url_filename_template: "{name}-linux-amd64"
+      - name: kubectx
+        release_type: tarball
+        github_args:
+          project: ahmetb/kubectx
+          url_filename_template: "{name}_{version}_linux_x86_64.tar.gz"
+"""
+
+RETURN = r"""
+results:
+  description:
+    - One result per item of C(releases), in the same order.
+    - Each result contains the same keys as the single release modules
+      return, plus C(name), C(changed) and, for failed items, C(failed) and
+      C(msg).
+  type: list
+  elements: dict
+  returned: always
+  sample:
+    - name: kubectl
+      changed: true
+      dest: /usr/local/bin/kubectl
+      version: v1.29.0
+"""
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+
+from ansible_collections.dstanek.software.plugins.module_utils import batch
+from ansible_collections.dstanek.software.plugins.module_utils import github_api
+from ansible_collections.dstanek.software.plugins.module_utils import retry
+from ansible_collections.dstanek.software.plugins.module_utils.errors import (
+    SoftwareException,
+)
+
+MODULE_SPEC = dict(
+    releases=dict(
+        type="list", elements="dict", required=True, options=batch.RELEASE_SPEC
+    ),
+    max_workers=dict(type="int", default=4),
+    dest=dict(type="path", default="/usr/local/bin"),
+    mode=dict(default=0o755, type="raw"),
+    owner=dict(type="str"),
+    group=dict(type="str"),
+    state=dict(
+        type="str",
+        choices=["absent", "present", "latest"],
+        default="latest",
+    ),
+    cache_dir=dict(type="path"),
+    cache_max_size=dict(type="int", default=1024),
+    version_cache_ttl=dict(type="int", default=0),
+    conditional_requests=dict(type="bool", default=False),
+    download_attempts=dict(type="int", default=1),
+    download_chunks=dict(type="int", default=1),
+    retry=dict(type="dict", default={}, options=retry.RETRY_SPEC),
+    mirrors=dict(type="list", elements="str", default=[]),
+    keep_versions=dict(type="int", default=0),
+    dedupe=dict(type="str", choices=["none", "hardlink", "reflink"], default="none"),
+    github_api=dict(type="bool", default=False),
+    github_api_url=dict(type="str", default="https://api.github.com"),
+    github_token=dict(
+        type="str", no_log=True, fallback=(env_fallback, ["GITHUB_TOKEN"])
+    ),
+)
+
+
+def prefetch(module: AnsibleModule, items) -> None:
+    """Look up the latest GitHub releases of all API backed items at once.
+
+    If the batched lookup fails each item resolves its own version, so the
+    error is reported against the items it affects.
+    """
+    resolvers = [
+        resolver
+        for item, resolver in items
+        if isinstance(resolver, github_api.GithubApiResolver)
+        and item.params["state"] != "absent"
+        and "=" not in item.params["name"]
+    ]
+    try:
+        github_api.prefetch(resolvers)
+    except SoftwareException:
+        pass
+
+
+def main():
+    module = AnsibleModule(argument_spec=MODULE_SPEC, supports_check_mode=True)
+
+    items = [
+        batch.build_item(
+            module, release, batch.RELEASE_SHARED_OPTIONS, "download_url_template"
+        )
+        for release in module.params["releases"]
+    ]
+    prefetch(module, items)
+    results = batch.run_all(items, module.params["max_workers"])
+
+    changed = any(result.get("changed") for result in results)
+    diff = [result.pop("diff") for result in results if "diff" in result]
+    if any(result.get("failed") for result in results):
+        module.fail_json(
+            "One or more releases failed", changed=changed, results=results
+        )
+
+    if diff:
+        module.exit_json(changed=changed, results=results, diff=diff)
+    module.exit_json(changed=changed, results=results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r"""
+---
+module: dstanek.software.software_facts
+short_description: Report the software releases installed on a host
+description:
+  - Lists the releases installed in each of C(paths) by the other modules in
+    this collection and returns them as facts.
+  - Each directory is listed once. Releases are read from the directory's
+    manifest when there is one and otherwise recognized by their
+    C(name -> name-<version>) links, so the module is cheap enough to run on
+    every play. No network requests are made.
+author: "David Stanek (@dstanek)"
+options:
+  paths:
+    type: list
+    elements: path
+    description:
+      - Directories to look for installed releases in.
+    default: ["/usr/local/bin"]
+
+notes:
+  - Supports check mode.
+requirements: []
+"""
+
+EXAMPLES = r"""
+- name: Gather installed software
+  dstanek.software.software_facts:
+    paths:
+      - /usr/local/bin
+      - ~/.local/bin
+
+- name: Show the installed version of kind
+  ansible.builtin.debug:
+    msg: "{{ installed_software['/usr/local/bin'].kind.version }}"
+"""
+
+RETURN = r"""
+ansible_facts:
+  description: Facts about the installed releases
+  returned: always
+  type: complex
+  contains:
+    installed_software:
+      description:
+        - The releases found in each of C(paths), keyed by directory and then
+          by name.
+        - Each release has C(version), C(files) mapping each link to its
+          target and C(source), which is C(manifest) or C(link).
+        - Releases from a manifest also have C(checksum), C(url) and
+          C(installed_at).
+      type: dict
+      sample:
+        /usr/local/bin:
+          kind:
+            version: v0.20.0
+            files:
+              /usr/local/bin/kind: /usr/local/bin/kind-v0.20.0
+            source: link
+"""
+
+from pathlib import Path
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.dstanek.software.plugins.module_utils import inventory
+
+MODULE_SPEC = dict(
+    paths=dict(type="list", elements="path", default=["/usr/local/bin"]),
+)
+
+
+def main():
+    module = AnsibleModule(argument_spec=MODULE_SPEC, supports_check_mode=True)
+
+    installed = {
+        path: inventory.scan(Path(path)) for path in module.params["paths"]
+    }
+    module.exit_json(changed=False, ansible_facts={"installed_software": installed})
+
+
+if __name__ == "__main__":
+    main()
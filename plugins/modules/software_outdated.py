@@ -0,0 +1,203 @@
+#!/usr/bin/python
+
+DOCUMENTATION = r"""
+---
+module: dstanek.software.software_outdated
+short_description: Report which installed software releases are out of date
+description:
+  - Compares the installed version of each of C(tools) with the latest
+    version available upstream.
+  - Each item accepts the options of M(dstanek.software.generic_release) or
+    M(dstanek.software.github_release) that resolve versions - C(name),
+    C(source), C(dest), C(tarball_args), C(github_args), C(os_platform),
+    C(version_url_template), C(download_url_template), C(github_host),
+    C(github_project), C(cache_dir), C(version_cache_ttl),
+    C(conditional_requests), C(retry), C(mirrors), C(github_api),
+    C(github_api_url) and C(github_token).
+  - Latest versions are resolved concurrently on a bounded thread pool and
+    nothing is downloaded. Installed versions are read from each C(dest) as
+    M(dstanek.software.software_facts) does.
+author: "David Stanek (@dstanek)"
+options:
+  tools:
+    type: list
+    elements: dict
+    description:
+      - The tools to check.
+      - C(source) selects the resolver used for an item. It defaults to
+        C(github) when C(github_args) is given and C(generic) otherwise.
+      - Generic tools need C(version_url_template).
+      - Options that are not set on an item are taken from the options of the
+        same name on this module.
+    required: true
+
+  max_workers:
+    type: int
+    description:
+      - Maximum number of latest versions resolved at the same time.
+    default: 4
+
+  dest:
+    type: path
+    description:
+      - Default directory the tools are installed in.
+    default: "/usr/local/bin"
+
+  cache_dir:
+    type: path
+    description:
+      - Default directory used to cache resolved versions.
+    default: null
+
+  version_cache_ttl:
+    type: int
+    description:
+      - Default number of seconds a resolved latest version is reused.
+    default: 0
+
+  conditional_requests:
+    type: bool
+    description:
+      - Default for sending conditional requests using recorded validators.
+    default: false
+
+  retry:
+    type: dict
+    description:
+      - Default retry policy for HTTP requests. See
+        M(dstanek.software.generic_release) for its suboptions.
+    default: {}
+
+  mirrors:
+    type: list
+    elements: str
+    description:
+      - Default mirrors to try before the origin. See
+        M(dstanek.software.generic_release).
+    default: []
+
+  github_api:
+    type: bool
+    description:
+      - Default for resolving GitHub releases through the GitHub API.
+      - The latest releases of all such items that share C(github_api_url)
+        and C(github_token) are looked up together, in a single GraphQL
+        request when a token is available.
+    default: false
+
+  github_api_url:
+    type: str
+    description:
+      - Default base URL of the GitHub REST API.
+    default: "https://api.github.com"
+
+  github_token:
+    type: str
+    description:
+      - Default token used to authenticate with the GitHub API.
+      - Defaults to the C(GITHUB_TOKEN) environment variable.
+    default: null
+
+notes:
+  - Supports check mode. The module never changes anything.
+requirements: []
+"""
+
+EXAMPLES = r"""
+- name: Check the Kubernetes tool belt for updates
+  dstanek.software.software_outdated:
+    dest: ~/.local/bin
+    tools:
+      - name: kubectl
+        version_url_template: https://dl.k8s.io/release/stable.txt
+        download_url_template: https://dl.k8s.io/release/{version}/bin/linux/amd64/kubectl
+      - name: kind
+        github_args:
+          project: kubernetes-sigs/kind
+          url_filename_template: "{name}-linux-amd64"
+  register: updates
+
+- name: Show what is out of date
+  ansible.builtin.debug:
+    msg: "{{ updates.outdated }}"
+"""
+
+RETURN = r"""
+tools:
+  description:
+    - One result per item of C(tools), in the same order.
+    - C(installed) is null for tools that are not installed. C(outdated) is
+      true when an installed tool is not at the latest version.
+    - Items whose latest version could not be resolved have C(failed) and
+      C(msg) instead of C(latest) and C(outdated).
+  type: list
+  elements: dict
+  returned: always
+  sample:
+    - {name: kubectl, installed: v1.28.4, latest: v1.29.0, outdated: true}
+    - {name: kind, installed: v0.20.0, latest: v0.20.0, outdated: false}
+outdated:
+  description: Names of the tools that are out of date
+  type: list
+  elements: str
+  returned: always
+  sample: [kubectl]
+"""
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+
+from ansible_collections.dstanek.software.plugins.module_utils import batch
+from ansible_collections.dstanek.software.plugins.module_utils import github_api
+from ansible_collections.dstanek.software.plugins.module_utils import outdated
+from ansible_collections.dstanek.software.plugins.module_utils import retry
+from ansible_collections.dstanek.software.plugins.module_utils.errors import (
+    SoftwareException,
+)
+
+MODULE_SPEC = dict(
+    tools=dict(
+        type="list", elements="dict", required=True, options=batch.RESOLVE_SPEC
+    ),
+    max_workers=dict(type="int", default=4),
+    dest=dict(type="path", default="/usr/local/bin"),
+    cache_dir=dict(type="path"),
+    version_cache_ttl=dict(type="int", default=0),
+    conditional_requests=dict(type="bool", default=False),
+    retry=dict(type="dict", default={}, options=retry.RETRY_SPEC),
+    mirrors=dict(type="list", elements="str", default=[]),
+    github_api=dict(type="bool", default=False),
+    github_api_url=dict(type="str", default="https://api.github.com"),
+    github_token=dict(
+        type="str", no_log=True, fallback=(env_fallback, ["GITHUB_TOKEN"])
+    ),
+)
+
+
+def main():
+    module = AnsibleModule(argument_spec=MODULE_SPEC, supports_check_mode=True)
+
+    items = [
+        batch.build_item(
+            module, tool, batch.RESOLVE_SHARED_OPTIONS, "version_url_template"
+        )
+        for tool in module.params["tools"]
+    ]
+    try:
+        github_api.prefetch(
+            [r for _, r in items if isinstance(r, github_api.GithubApiResolver)]
+        )
+    except SoftwareException:
+        # Each item resolves its own version and reports its own error
+        pass
+    results = outdated.check_all(items, module.params["max_workers"])
+
+    names = [result["name"] for result in results if result.get("outdated")]
+    if any(result.get("failed") for result in results):
+        module.fail_json(
+            "One or more tools could not be checked", tools=results, outdated=names
+        )
+    module.exit_json(changed=False, tools=results, outdated=names)
+
+
+if __name__ == "__main__":
+    main()
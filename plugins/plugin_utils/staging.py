@@ -0,0 +1,151 @@
+import fcntl
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.common.arg_spec import ArgumentSpecValidator
+from ansible.plugins.action import ActionBase
+
+from ansible_collections.dstanek.software.plugins.module_utils import cache
+from ansible_collections.dstanek.software.plugins.module_utils.common import (
+    SoftwareRequest,
+)
+from ansible_collections.dstanek.software.plugins.module_utils.errors import (
+    SoftwareException,
+)
+
+# How long a resolved version is reused on the controller when the task does
+# not set version_cache_ttl. Long enough for every fork to share one lookup.
+DEFAULT_VERSION_CACHE_TTL = 300
+
+
+class ControllerModule:
+    """Just enough of AnsibleModule to run a resolver on the controller."""
+
+    # Check mode runs the module on the host instead
+    check_mode = False
+
+    def __init__(self, params):
+        self.params = params
+        self.tmpdir = tempfile.gettempdir()
+
+    def fail_json(self, msg, **kwargs):
+        raise AnsibleActionFail(msg, result=kwargs)
+
+
+@contextmanager
+def locked(path: Path):
+    """Serialize staging across forks so only one of them downloads."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class StagingAction(ActionBase):
+    """Base for actions that can download a release once on the controller.
+
+    Subclasses provide the module's argument spec and resolver. Unless
+    ``download_on_controller`` is set the module simply runs on the host.
+    Otherwise the version is resolved on the controller and each host is
+    first checked in check mode; the artifact is only copied to hosts that
+    would change.
+    """
+
+    TRANSFERS_FILES = True
+
+    module_spec = None
+    resolver_class = None
+
+    def prepare_params(self, params):
+        """Hook for filling in module specific defaults."""
+
+    def make_resolver(self, module):
+        """Hook for choosing the resolver from the task's options."""
+        return self.resolver_class(module)
+
+    def run(self, tmp=None, task_vars=None):
+        result = super().run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        # Check mode never downloads, so there is nothing to stage
+        if (
+            not args.get("download_on_controller")
+            or args.get("state") == "absent"
+            or self._task.check_mode
+        ):
+            result.update(self._execute_module(task_vars=task_vars))
+            return result
+
+        try:
+            params, resolver = self._controller_resolver(args)
+            cache_dir = Path(params["cache_dir"])
+            with locked(cache_dir / ".lock"):
+                version = SoftwareRequest(params, resolver).version
+        except SoftwareException as e:
+            result.update(failed=True, msg=str(e), **e.context)
+            return result
+
+        try:
+            # Only hosts that need the version are sent the artifact; the
+            # others answer from their own files without any requests
+            planned = self._check(dict(args, staged_version=version), task_vars)
+            if planned.get("failed") or not planned.get("changed"):
+                result.update(planned)
+                return result
+
+            try:
+                with locked(cache_dir / ".lock"), resolver.download(version) as f:
+                    local_path = Path(f.name)
+            except SoftwareException as e:
+                result.update(failed=True, msg=str(e), **e.context)
+                return result
+
+            tmpdir = self._connection._shell.tmpdir
+            remote_path = self._connection._shell.join_path(tmpdir, "staged_artifact")
+            self._transfer_file(str(local_path), remote_path)
+            self._fixup_perms2((tmpdir, remote_path))
+
+            module_args = dict(
+                args, staged_artifact=remote_path, staged_version=version
+            )
+            result.update(
+                self._execute_module(module_args=module_args, task_vars=task_vars)
+            )
+            if result.get("failed") and result.get("msg") == "Checksum mismatch":
+                # Serve the next run a fresh download rather than the same
+                # bad artifact
+                cache.from_params(params).discard(
+                    resolver.download_url(version), version
+                )
+        finally:
+            self._remove_tmp_path(self._connection._shell.tmpdir)
+        return result
+
+    def _check(self, module_args, task_vars):
+        """Run the module in check mode, to see whether it would change."""
+        check_mode = self._task.check_mode
+        self._task.check_mode = True
+        try:
+            return self._execute_module(module_args=module_args, task_vars=task_vars)
+        finally:
+            self._task.check_mode = check_mode
+
+    def _controller_resolver(self, args):
+        validation = ArgumentSpecValidator(self.module_spec).validate(args)
+        if validation.error_messages:
+            raise AnsibleActionFail(", ".join(validation.error_messages))
+
+        params = validation.validated_parameters
+        self.prepare_params(params)
+        params.update(
+            cache_dir=str(Path(params["controller_cache_dir"]).expanduser()),
+            version_cache_ttl=params["version_cache_ttl"] or DEFAULT_VERSION_CACHE_TTL,
+            conditional_requests=False,
+        )
+        return params, self.make_resolver(ControllerModule(params))
@@ -0,0 +1,155 @@
+"""A local release server for benchmarks.
+
+Serves large generated artifacts and can make the network misbehave. Every
+route accepts these query parameters:
+
+  latency   seconds to wait before answering
+  rate      bandwidth cap in bytes per second
+  drop      fraction of responses whose connection is cut half way through
+  errors    fraction of requests answered with a 503
+
+Routes:
+
+  /version                          the version to install, v1.0
+  /binary/{size}/{name}             ``size`` bytes of incompressible data
+  /tarball/{members}/{size}/{name}  a tar.gz of ``members`` files of ``size``
+                                    bytes, the last of which is ``name``
+
+Ranges are supported so that resumed downloads can be measured as well.
+"""
+import argparse
+import asyncio
+import io
+import random
+import tarfile
+from functools import lru_cache
+
+from aiohttp import web
+
+CHUNK_SIZE = 64 * 1024
+BLOCK_SIZE = 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def _block() -> bytes:
+    # Larger than the deflate window, so repeating it does not compress
+    return random.Random(0).getrandbits(BLOCK_SIZE * 8).to_bytes(BLOCK_SIZE, "little")
+
+
+def binary(size: int, start: int = 0, end: int = None):
+    """Yield bytes ``start`` to ``end`` of a ``size`` byte artifact."""
+    end = size if end is None else end
+    block = _block()
+    pos = start
+    while pos < end:
+        offset = pos % BLOCK_SIZE
+        chunk = block[offset : offset + min(CHUNK_SIZE, end - pos, BLOCK_SIZE - offset)]
+        yield chunk
+        pos += len(chunk)
+
+
+@lru_cache(maxsize=8)
+def tarball(members: int, size: int, name: str) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz", compresslevel=1) as tf:
+        for i in range(members):
+            info = tarfile.TarInfo(name if i == members - 1 else f"member-{i}")
+            info.size = size
+            info.mode = 0o755
+            tf.addfile(info, io.BytesIO(b"".join(binary(size))))
+    return buf.getvalue()
+
+
+def _faults(request):
+    q = request.query
+    return (
+        float(q.get("latency", 0)),
+        int(q.get("rate", 0)),
+        float(q.get("drop", 0)),
+        float(q.get("errors", 0)),
+    )
+
+
+async def _send(request, size: int, chunks):
+    """Stream ``chunks`` honoring Range and the fault parameters."""
+    latency, rate, drop, errors = _faults(request)
+    if latency:
+        await asyncio.sleep(latency)
+    if random.random() < errors:
+        return web.Response(status=503)
+
+    start, end, status = 0, size, 200
+    headers = {"Accept-Ranges": "bytes"}
+    range_header = request.headers.get("Range")
+    if range_header:
+        first, _, last = range_header.split("=")[1].partition("-")
+        if not first:
+            first, last = max(size - int(last), 0), size - 1
+        start, end, status = int(first), min(int(last or size - 1), size - 1) + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    response = web.StreamResponse(status=status, headers=headers)
+    response.content_length = end - start
+    await response.prepare(request)
+
+    cut_at = start + (end - start) // 2 if random.random() < drop else None
+    sent = start
+    for chunk in chunks(start, end):
+        if cut_at is not None and sent + len(chunk) > cut_at:
+            await response.write(chunk[: cut_at - sent])
+            request.transport.close()
+            return response
+        await response.write(chunk)
+        sent += len(chunk)
+        if rate:
+            await asyncio.sleep(len(chunk) / rate)
+    await response.write_eof()
+    return response
+
+
+async def version(request):
+    latency, _, _, errors = _faults(request)
+    if latency:
+        await asyncio.sleep(latency)
+    if random.random() < errors:
+        return web.Response(status=503)
+    return web.Response(text="v1.0")
+
+
+async def binary_route(request):
+    size = int(request.match_info["size"])
+    return await _send(request, size, lambda start, end: binary(size, start, end))
+
+
+async def tarball_route(request):
+    body = tarball(
+        int(request.match_info["members"]),
+        int(request.match_info["size"]),
+        request.match_info["name"],
+    )
+
+    def chunks(start, end):
+        for pos in range(start, end, CHUNK_SIZE):
+            yield body[pos : min(pos + CHUNK_SIZE, end)]
+
+    return await _send(request, len(body), chunks)
+
+
+def init_app():
+    app = web.Application()
+    app.router.add_get("/version", version)
+    app.router.add_get("/binary/{size}/{name}", binary_route)
+    app.router.add_get("/tarball/{members}/{size}/{name}", tarball_route)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    web.run_app(init_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
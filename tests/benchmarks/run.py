@@ -0,0 +1,255 @@
+"""Benchmarks for the download and install code in module_utils.
+
+    python tests/benchmarks/run.py [--size-mb 64] [--latency 0.05] [--drop 0.2] ...
+
+Starts release_server.py and runs each case against it in a process of its
+own, so that the peak RSS reported is that of the case alone. The cases call
+module_utils with a real AnsibleModule, exactly as the modules do.
+
+  slurp            download.slurp of one binary
+  executable       download.executable of one binary
+  executable-noop  an idempotent download.executable run
+  tarball          download.tarball extracting the last of many members
+  versioned-path   VersionedPath construction and verify
+
+Requires aiohttp, like the integration tests' fake server.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parents[1]
+
+CASES = ("slurp", "executable", "executable-noop", "tarball", "versioned-path")
+
+# Idempotent runs and VersionedPath operations are too quick to time once
+NOOP_RUNS = 50
+VERSIONED_PATH_RUNS = 1000
+
+
+def _import_collection(workdir: Path) -> None:
+    link = workdir / "ansible_collections" / "dstanek" / "software"
+    link.parent.mkdir(parents=True)
+    link.symlink_to(ROOT)
+    sys.path.insert(0, str(workdir))
+
+
+def _module(params: dict):
+    from ansible.module_utils import basic
+    from ansible.module_utils.common.text.converters import to_bytes
+    from ansible_collections.dstanek.software.plugins.modules.generic_release import (
+        MODULE_SPEC,
+    )
+
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({"ANSIBLE_MODULE_ARGS": params}))
+    # ansible-core 2.19 and later also want to know how the arguments were encoded
+    basic._ANSIBLE_PROFILE = "legacy"
+    return basic.AnsibleModule(argument_spec=MODULE_SPEC)
+
+
+def _params(config: dict, dest: Path, url: str, **extra) -> dict:
+    params = dict(
+        name="bench=v1.0",
+        dest=str(dest),
+        download_url_template=url,
+        download_attempts=config["attempts"],
+        download_chunks=config["chunks"],
+        retry={"retries": config["retries"], "delay": 0.1},
+    )
+    params.update(extra)
+    return params
+
+
+def run_case(case: str, config: dict, workdir: Path) -> dict:
+    """Run one case in this process and return what it measured."""
+    _import_collection(workdir)
+    from ansible_collections.dstanek.software.plugins.module_utils import download
+    from ansible_collections.dstanek.software.plugins.module_utils.resolvers import (
+        GenericResolver,
+    )
+    from ansible_collections.dstanek.software.plugins.module_utils.versioned_path import (
+        VersionedPath,
+    )
+
+    dest = workdir / "bin"
+    dest.mkdir()
+    size = config["size"]
+    query = f"?{config['query']}" if config["query"] else ""
+    binary_url = f"{config['server']}/binary/{size}/bench{query}"
+
+    if case == "slurp":
+        module = _module(_params(config, dest, binary_url))
+        start = time.perf_counter()
+        transferred = len(download.slurp(module, "v1.0"))
+        return {"seconds": time.perf_counter() - start, "bytes": transferred}
+
+    if case in ("executable", "executable-noop"):
+        module = _module(_params(config, dest, binary_url))
+        start = time.perf_counter()
+        download.executable(GenericResolver(module), "bench", module, dest, "v1.0")
+        elapsed = time.perf_counter() - start
+        if case == "executable":
+            return {"seconds": elapsed, "bytes": size}
+
+        start = time.perf_counter()
+        for _ in range(NOOP_RUNS):
+            changed, _ = download.executable(
+                GenericResolver(module), "bench", module, dest, "v1.0"
+            )
+            assert not changed
+        return {"seconds": (time.perf_counter() - start) / NOOP_RUNS, "bytes": 0}
+
+    if case == "tarball":
+        members = config["members"]
+        member_size = size // members
+        url = f"{config['server']}/tarball/{members}/{member_size}/bench{query}"
+        module = _module(
+            _params(
+                config,
+                dest,
+                url,
+                release_type="tarball",
+                tarball_args={"files": [{"src": "bench", "dest": "bench"}]},
+            )
+        )
+        start = time.perf_counter()
+        download.tarball(GenericResolver(module), module, dest, "v1.0")
+        return {"seconds": time.perf_counter() - start, "bytes": member_size * members}
+
+    if case == "versioned-path":
+        module = _module(_params(config, dest, binary_url))
+        vp = VersionedPath(dest / "bench")
+        file_args = module.load_file_common_arguments(module.params)
+        vp.write_target(b"bench", "v1.0", file_args)
+        vp.relink("v1.0")
+        start = time.perf_counter()
+        for _ in range(VERSIONED_PATH_RUNS):
+            assert VersionedPath(dest / "bench").verify("v1.0")
+        elapsed = time.perf_counter() - start
+        return {"seconds": elapsed / VERSIONED_PATH_RUNS, "bytes": 0}
+
+    raise ValueError(f"Unknown case: {case}")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, str(HERE / "release_server.py"), "--port", str(port)]
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("release_server.py did not start")
+
+
+def _measure(case: str, config: dict) -> dict:
+    """Run a case in a child process and add its peak RSS."""
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--run-case", case, "--config", json.dumps(config)],
+        stdout=subprocess.PIPE,
+    )
+    output = child.stdout.read()
+    _, status, rusage = os.wait4(child.pid, 0)
+    if not os.WIFEXITED(status) or os.WEXITSTATUS(status):
+        return {"case": case, "error": f"failed with wait status {status}"}
+
+    result = json.loads(output)
+    result["case"] = case
+    # ru_maxrss is in KiB on Linux
+    result["peak_rss_mb"] = rusage.ru_maxrss / 1024
+    if result["bytes"]:
+        result["mb_per_s"] = result["bytes"] / result["seconds"] / 1024 / 1024
+    return result
+
+
+def _report(results) -> None:
+    print(f"{'case':<16} {'seconds':>10} {'MB/s':>10} {'peak RSS MiB':>13}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['case']:<16} {r['error']}")
+            continue
+        rate = f"{r['mb_per_s']:.1f}" if "mb_per_s" in r else "-"
+        print(f"{r['case']:<16} {r['seconds']:>10.4f} {rate:>10} {r['peak_rss_mb']:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--size-mb", type=int, default=64, help="artifact size")
+    parser.add_argument("--members", type=int, default=200, help="tarball members")
+    parser.add_argument("--chunks", type=int, default=1, help="parallel range requests")
+    parser.add_argument("--latency", type=float, default=0, help="seconds per response")
+    parser.add_argument("--rate", type=int, default=0, help="bytes per second cap")
+    parser.add_argument("--drop", type=float, default=0, help="fraction of dropped responses")
+    parser.add_argument("--errors", type=float, default=0, help="fraction of 503 responses")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        workdir = Path(tempfile.mkdtemp(prefix="dstanek-software-bench-"))
+        try:
+            print(json.dumps(run_case(args.run_case, json.loads(args.config), workdir)))
+        finally:
+            shutil.rmtree(workdir)
+        return
+
+    faults = {
+        k: v
+        for k, v in dict(
+            latency=args.latency, rate=args.rate, drop=args.drop, errors=args.errors
+        ).items()
+        if v
+    }
+    port = _free_port()
+    config = dict(
+        server=f"http://127.0.0.1:{port}",
+        query=urlencode(faults),
+        size=args.size_mb * 1024 * 1024,
+        members=args.members,
+        chunks=args.chunks,
+        # Faults need resuming and retrying for the runs to complete
+        attempts=10 if args.drop else 1,
+        retries=5 if args.errors else 0,
+    )
+
+    server = _start_server(port)
+    try:
+        results = [_measure(case, config) for case in args.cases]
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _report(results)
+    if any("error" in r for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,15 @@
 import asyncio
+import bz2
+import gzip
+import hashlib
+import io
+import json
 import logging
+import lzma
+import random
+import tarfile
+import zipfile
+from functools import lru_cache
 from typing import Any
 
 from aiohttp import web
@@ -17,22 +27,66 @@ web_server.RequestHandler = RequestHandler
 
 
 class Handler:
+    def __init__(self):
+        self.graphql_requests = 0
+        self.zip_bytes_served = 0
+        self.mirror_requests = 0
+        self.range_requests = 0
+
     def index(self, request):
         return web.json_response({"name": "dstanek"})
 
     def generic_version(self, request):
-        return web.Response(text="v2.0")
+        return conditional_response(request, "v2.0")
+
+    def generic_version_line(self, request):
+        return web.Response(text="v2.0\n")
 
     def generic_download(self, request):
         software_name = request.match_info["software_name"]
         version = request.match_info["version"]
-        return web.Response(text=f"<>{software_name}@{version}</>")
+        return conditional_response(request, f"<>{software_name}@{version}</>")
+
+    def mirror_download(self, request):
+        self.mirror_requests += 1
+        return self.generic_download(request)
 
     def generic_download_5XX(self, request):
         software_name = request.match_info["software_name"]
         version = request.match_info["version"]
         return web.Response(status=500)
 
+    async def generic_download_flaky(self, request):
+        """Drops the connection half way through unless a Range is requested.
+
+        A Range whose If-Range does not match is answered with the whole file.
+        """
+        software_name = request.match_info["software_name"]
+        version = request.match_info["version"]
+        body = f"<>{software_name}@{version}</>".encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+        range_header = request.headers.get("Range")
+        if range_header and request.headers.get("If-Range", etag) != etag:
+            return web.Response(body=body, headers={"ETag": etag})
+        if range_header:
+            start = int(range_header.split("=")[1].split("-")[0])
+            return web.Response(
+                status=206,
+                body=body[start:],
+                headers={
+                    "Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}",
+                    "ETag": etag,
+                },
+            )
+
+        response = web.StreamResponse(headers={"Accept-Ranges": "bytes", "ETag": etag})
+        response.content_length = len(body)
+        await response.prepare(request)
+        await response.write(body[: len(body) // 2])
+        request.transport.close()
+        return response
+
     def github_latest(self, request):
         user = request.match_info["user"]
         project = request.match_info["project"]
@@ -46,11 +100,198 @@ class Handler:
         version = request.match_info["version"]
         return web.Response(text=f"<>{project}@{version}</>")
 
-    def github_download_tarball(self, request):
+    def github_download_templated(self, request):
+        """Serves a file only under the name its templated test renders."""
         project = request.match_info["project"]
         version = request.match_info["version"]
+        if request.match_info["filename"] != f"{project}-{version}-linux-amd64":
+            return web.Response(status=404)
         return web.Response(text=f"<>{project}@{version}</>")
 
+    def github_checksums(self, request):
+        project = request.match_info["project"]
+        version = request.match_info["version"]
+        body = f"<>{project}@{version}</>".encode()
+        digest = hashlib.sha256(body).hexdigest()
+        return web.Response(text=f"{digest}  README.md\n{digest}  {project}\n")
+
+    def github_download_tarball(self, request):
+        software_name = request.match_info["software_name"]
+        version = request.match_info["version"]
+        return web.Response(body=make_tarball({
+            "README.md": "Not what we are looking for",
+            software_name: f"<>{software_name}@{version}</>",
+        }))
+
+    def api_latest_release(self, request):
+        owner = request.match_info["owner"]
+        repo = request.match_info["repo"]
+        release = fake_release(request, owner, repo)
+        return web.json_response(
+            {
+                "tag_name": release["tagName"],
+                "assets": [
+                    {"name": a["name"], "browser_download_url": a["downloadUrl"]}
+                    for a in release["releaseAssets"]["nodes"]
+                ],
+            },
+            headers=rate_limit_headers(),
+        )
+
+    async def api_graphql(self, request):
+        """Answers the aliased repository queries the resolver batches."""
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response({"message": "Bad credentials"}, status=401)
+        self.graphql_requests += 1
+
+        variables = json.loads(await request.read())["variables"]
+        data = {}
+        i = 0
+        while f"o{i}" in variables:
+            release = fake_release(request, variables[f"o{i}"], variables[f"n{i}"])
+            data[f"r{i}"] = {"latestRelease": release}
+            i += 1
+        return web.json_response({"data": data}, headers=rate_limit_headers())
+
+    def api_stats(self, request):
+        return web.json_response({
+            "graphql_requests": self.graphql_requests,
+            "zip_bytes_served": self.zip_bytes_served,
+            "mirror_requests": self.mirror_requests,
+            "range_requests": self.range_requests,
+        })
+
+    def github_download_zip(self, request):
+        """Serves a zip bundle, honoring Range requests."""
+        body = make_zip(request.match_info["software_name"], request.match_info["version"])
+        response = range_response(request, body)
+        self.zip_bytes_served += len(response.body)
+        return response
+
+    def github_download_bundle_zip(self, request):
+        """Serves a zip whose central directory is larger than one tail read."""
+        body = make_zip(
+            request.match_info["software_name"], request.match_info["version"], 3000
+        )
+        return range_response(request, body)
+
+    def generic_download_zip(self, request):
+        """Serves a zip bundle, ignoring Range requests."""
+        body = make_zip(request.match_info["software_name"], request.match_info["version"])
+        self.zip_bytes_served += len(body)
+        return web.Response(body=body)
+
+    def generic_download_large(self, request):
+        """Serves a file large enough to download in parallel, honoring Range."""
+        body = make_large(request.match_info["software_name"], request.match_info["version"])
+        if "Range" in request.headers:
+            self.range_requests += 1
+        return range_response(request, body)
+
+    def generic_download_large_checksum(self, request):
+        body = make_large(request.match_info["software_name"], request.match_info["version"])
+        return web.Response(text=hashlib.sha256(body).hexdigest())
+
+    def generic_download_compressed(self, request):
+        software_name = request.match_info["software_name"]
+        version = request.match_info["version"]
+        body = f"<>{software_name}@{version}</>".encode()
+        return web.Response(body=compress(body, request.match_info["codec"]))
+
+    def generic_download_compressed_checksum(self, request):
+        body = self.generic_download_compressed(request).body
+        return web.Response(text=hashlib.sha256(body).hexdigest())
+
+    def generic_download_compressed_tarball(self, request):
+        software_name = request.match_info["software_name"]
+        version = request.match_info["version"]
+        return web.Response(body=make_tarball({
+            "README.md": "Not what we are looking for",
+            software_name: f"<>{software_name}@{version}</>",
+        }, request.match_info["codec"]))
+
+
+def fake_release(request, owner, repo):
+    version = "v2.0"
+    base = f"http://{request.host}/{owner}/{repo}/releases/download/{version}"
+    return {
+        "tagName": version,
+        "releaseAssets": {
+            "nodes": [
+                {"name": name, "downloadUrl": f"{base}/{name}"}
+                for name in (repo, f"{repo}.tar.gz", "checksums.txt")
+            ]
+        },
+    }
+
+
+def rate_limit_headers():
+    return {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": "0"}
+
+
+def conditional_response(request, text):
+    etag = f'"{hashlib.sha256(text.encode()).hexdigest()[:16]}"'
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers={"ETag": etag})
+    return web.Response(text=text, headers={"ETag": etag})
+
+
+def make_tarball(files, codec="gz"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=f"w:{codec}") as tf:
+        for name, contents in files.items():
+            data = contents.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=None)
+def make_zip(software_name, version, members=0):
+    # The other tools in the bundle; incompressible so their size is honest
+    size = 1024 * 1024
+    padding = random.Random(version).getrandbits(size * 8).to_bytes(size, "little")
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("README.md", "Not what we are looking for")
+        zf.writestr("other-tools.bin", padding)
+        for i in range(members):
+            zf.writestr(f"share/doc/page-{i:04}.txt", f"page {i}")
+        zf.writestr(software_name, f"<>{software_name}@{version}</>")
+    return buf.getvalue()
+
+
+def compress(data, codec):
+    if codec == "gz":
+        return gzip.compress(data, mtime=0)
+    if codec == "xz":
+        return lzma.compress(data)
+    return bz2.compress(data)
+
+
+@lru_cache(maxsize=4)
+def make_large(software_name, version):
+    size = 20 * 1024 * 1024
+    padding = random.Random(version).getrandbits(size * 8).to_bytes(size, "little")
+    return f"<>{software_name}@{version}</>".encode() + padding
+
+
+def range_response(request, body):
+    range_header = request.headers.get("Range")
+    if not range_header:
+        return web.Response(body=body, headers={"Accept-Ranges": "bytes"})
+    start, _, end = range_header.split("=")[1].partition("-")
+    if not start:
+        start, end = max(len(body) - int(end), 0), len(body) - 1
+    start, end = int(start), min(int(end or len(body) - 1), len(body) - 1)
+    return web.Response(
+        status=206,
+        body=body[start : end + 1],
+        headers={"Content-Range": f"bytes {start}-{end}/{len(body)}"},
+    )
+
 
 def init_app():
     h = Handler()
@@ -59,19 +300,63 @@ def init_app():
 
     # Generic paths
     app.router.add_get("/generic/stable-version.txt", h.generic_version)
+    app.router.add_get("/generic/stable-version-line.txt", h.generic_version_line)
+    app.router.add_get("/generic/download/{version}/{software_name}.zip", h.generic_download_zip)
+    app.router.add_get(
+        "/generic/download/{version}/{software_name}.tar.{codec:gz|xz|bz2}",
+        h.generic_download_compressed_tarball
+    )
+    app.router.add_get(
+        "/generic/download/{version}/{software_name}.{codec:gz|xz|bz2}.sha256",
+        h.generic_download_compressed_checksum
+    )
+    app.router.add_get(
+        "/generic/download/{version}/{software_name}.{codec:gz|xz|bz2}",
+        h.generic_download_compressed
+    )
     app.router.add_get("/generic/download/{version}/{software_name}", h.generic_download)
     app.router.add_get("/generic/download/{version}/{software_name}/5XX", h.generic_download_5XX)
+    app.router.add_get("/generic/download/{version}/{software_name}/flaky", h.generic_download_flaky)
+    app.router.add_get("/generic/download/{version}/{software_name}/large", h.generic_download_large)
+    app.router.add_get(
+        "/generic/download/{version}/{software_name}/large.sha256",
+        h.generic_download_large_checksum
+    )
+
+    # Mirror paths
+    app.router.add_get("/mirror/generic/download/{version}/{software_name}", h.mirror_download)
+
+    # GitHub API paths
+    app.router.add_get("/api/repos/{owner}/{repo}/releases/latest", h.api_latest_release)
+    app.router.add_post("/api/graphql", h.api_graphql)
+    app.router.add_get("/api/stats", h.api_stats)
 
     # GitHub paths
     app.router.add_get("/{user}/{project}/releases/latest", h.github_latest)
     app.router.add_get(
-        "/{user}/{project}/releases/download/{version}/{software_name}",
-        h.github_download_file
+        "/{user}/{project}/releases/download/{version}/checksums.txt",
+        h.github_checksums
+    )
+    app.router.add_get(
+        "/{user}/{project}/releases/download/{version}/bundle/{software_name}.zip",
+        h.github_download_bundle_zip
+    )
+    app.router.add_get(
+        "/{user}/{project}/releases/download/{version}/templated/{filename}",
+        h.github_download_templated
+    )
+    app.router.add_get(
+        "/{user}/{project}/releases/download/{version}/{software_name}.zip",
+        h.github_download_zip
     )
     app.router.add_get(
         "/{user}/{project}/releases/download/{version}/{software_name}.tar.gz",
         h.github_download_tarball
     )
+    app.router.add_get(
+        "/{user}/{project}/releases/download/{version}/{software_name}",
+        h.github_download_file
+    )
 
     return app
 